@@ -1,247 +1,87 @@
+import os
 import sys
 import time
+import argparse
+import functools
 from aliceengine import *
-import operator
+from alicebook import OpeningBook, build_book, play_moves
+from aliceprofile import MoveProfiler
+from aliceprotocol import ProtocolReader
+from alicerecord import GameRecordWriter, GameResult
+from alicesearch import configure, alpha_beta_pruning, transposition_move, \
+    remember_position, forget_position, book_search, benchmark_root_split, \
+    analyse_positions, SearchLimits, timer, print_msgs, evaluation_term_names, \
+    emit_held_result
+import alicesearch
+import threading
+import multiprocessing
 import random
 
-print_msgs = False
-common_threshold = 0.25
 
-
-def get_current_and_opponent_players(state):
-    """
-    identifies which team color the program is playing as and the opponent
-    :param state: instance of Board representing a state of the game
-    :return: a list where 1st element is our team and 2nd element is the opponent
-    """
-    if my_team_color == PlayerColor.White:
-        return [state.white_player, state.black_player]
-    else:
-        return [state.black_player, state.white_player]
-
-
-def evaluate_state(my_player, other_player):
+def ponder(state):
     """
-    calculates and evaluates a score for the state
-    :param my_player: an instance of the Player class representing our team
-    :param other_player: an instance of the Player class representing the opponent
-    :return: an integer score that evaluates the state
+    searches the state expected after the opponent's reply. Runs in a background
+    thread while the opponent thinks and keeps the best move found in ponder_result.
+    Its statistics and result are held back until stop_pondering sees a ponder hit.
+    :param state: instance of Board representing the expected state of the game
     """
-    evaluation = sum(my_player.get_active_pieces()) - sum(other_player.get_active_pieces())
-    my_mobility = sum(my_player.legal_moves)
-    other_mobility = sum(other_player.legal_moves)
-    check_bonus = 0
-    if my_player.is_in_check():
-        check_bonus = -50
-    if other_player.is_in_check():
-        check_bonus = 50
-    return evaluation + 0.1 * (my_mobility - other_mobility) + check_bonus
-
+    global ponder_result
+    remember_position(state)
+    ponder_result = alpha_beta_pruning(state, emit=False)
+    forget_position(state)
 
-"""#######################################################################################
-################################## Alpha-Beta Pruning ####################################
-#######################################################################################"""
 
-
-def alpha_beta_pruning(state):
-    """
-    implements alpha-beta pruning algorithm on the given state
-    :param state: instance of Board representing a state of the game
-    :return: an instance of Move
+def start_pondering():
     """
-    legal_moves = state.current_player.legal_moves
-    best_move = legal_moves[0]
-    possible_score = float("-inf")
-    alpha = float("-inf")
-    beta = float("inf")
-    legal_moves.sort(key=operator.attrgetter('value'), reverse=True)
-    avg_time = sum(times)/len(times)
-    diff = avg_time_constant - avg_time
-    threshold = 0.1
-    avail_time = avg_time_constant + diff
-    current_depth = 1
-    while avail_time > threshold:
-        start_time = time.time()
-        for move in legal_moves:
-            old_score = possible_score
-            next_state = state.current_player.make_move(move)
-            if next_state.move_status == MoveStatus.DONE:
-                if print_msgs:
-                    print "Trying ", str(move)
-                # analyse_state(next_state.transition_board)
-                t0 = time.time()
-                possible_score = max(possible_score, alpha_beta_min(next_state.transition_board,
-                                                                    alpha, beta,
-                                                                    avail_time,
-                                                                    depth=current_depth))
-                t1 = time.time()
-                avail_time -= (t1 - t0)
-                if avail_time <= common_threshold:
-                    break
-                if old_score < possible_score:
-                    best_move = move
-                alpha = max(alpha, possible_score)
-        end_time = time.time()
-        times.append(end_time - start_time)
-        avail_time -= times[-1]
-        debug.write("(" + str(current_depth) + " , " + str(times[-1]) + ")\n")
-        threshold += times[-1] ** current_depth
-        current_depth += 1
-    return best_move
-
-
-def alpha_beta_min(state, alpha, beta, avail_time, depth):
+    guesses the opponent's reply from the transposition table and starts pondering on
+    the resulting state, unless a ponder search is still running
     """
-    minimizer node analyzing the opponents moves
-    :param state: instance of Board representing a state of the game
-    :param alpha: an integer value representing the lower bound for apb
-    :param beta: an integer value representing the upper bound for apb
-    :param depth: an integer value representing how deep into the search tree apb goes
-    :return: an integer value that chooses the minimum from the child nodes
-    """
-    my_player, other_player = get_current_and_opponent_players(state)
-    if depth == 0 or avail_time <= common_threshold:
-        score = depth * evaluate_state(my_player, other_player)
-        if print_msgs:
-            print "\t"*depth, "(MIN)Returned = ", score
-        return score
-    legal_moves = state.current_player.legal_moves
-    val = float("inf")
-    legal_moves.sort(key=operator.attrgetter('value'), reverse=True)
-    for move in legal_moves:
-        next_state = state.current_player.make_move(move)
-        if next_state.move_status == MoveStatus.DONE:
-            if print_msgs:
-                print "\t" * depth, depth, ": Trying ", str(move)
-            t0 = time.time()
-            # analyse_state(next_state.transition_board)
-            val = min(val, alpha_beta_max(next_state.transition_board, alpha, beta,
-                                          avail_time, depth - 1))
-            t1 = time.time()
-            difference = t1 - t0
-            avail_time -= difference
-            if avail_time <= common_threshold:
-                return val
-
-            if val < alpha:
-                if print_msgs:
-                    print depth, " : PRUNED!"
-                return val
-            beta = min(beta, val)
-    return val
-
-
-def alpha_beta_max(state, alpha, beta, avail_time, depth=1):
+    global ponder_thread, ponder_move, ponder_state, ponder_result
+    if ponder_thread is not None and ponder_thread.is_alive():
+        return
+    ponder_move = transposition_move(game)
+    if ponder_move is None:
+        return
+    ponder_transition = game.current_player.make_move(ponder_move)
+    if ponder_transition.move_status != MoveStatus.DONE:
+        return
+    ponder_state = ponder_transition.transition_board
+    if len(ponder_state.current_player.legal_moves) == 0:
+        return
+    ponder_result = None
+    alicesearch.held_result = None
+    timer.start_pondering()
+    ponder_thread = threading.Thread(target=ponder, args=(ponder_state,))
+    ponder_thread.daemon = True
+    ponder_thread.start()
+
+
+def stop_pondering(move):
     """
-    maximizer node analyzing our teams' moves
-    :param state: instance of Board representing a state of the game
-    :param alpha: an integer value representing the lower bound for apb
-    :param beta: an integer value representing the upper bound for apb
-    :param depth: an integer value representing how deep into the search tree apb goes
-    :return: an integer value that chooses the maximum from the child nodes
+    ends pondering once the opponent's move is known. On a ponder hit the search goes on
+    with the limits of a normal search and its statistics and result are emitted, on a
+    ponder miss it is discarded.
+    :param move: an instance of Move made by the opponent, None if the game has ended
+    :return: an instance of Move found by pondering on a ponder hit else None
     """
-    my_player, other_player = get_current_and_opponent_players(state)
-    if depth == 0 or avail_time <= common_threshold:
-        score = depth * evaluate_state(my_player, other_player)
+    global ponder_thread, ponder_result, search_time
+    if ponder_thread is None:
+        return None
+    thread = ponder_thread
+    ponder_thread = None
+    if move is not None and move.get_key() == ponder_move.get_key():
+        timer.ponder_hit()
+        thread.join()
+        search_time = timer.finish()
         if print_msgs:
-            print "\t" * depth, "(MAX)Returned = ", score
-        return score
-    legal_moves = state.current_player.legal_moves
-    val = float("-inf")
-    legal_moves.sort(key=operator.attrgetter('value'), reverse=True)
-    for move in legal_moves:
-        next_state = state.current_player.make_move(move)
-        if next_state.move_status == MoveStatus.DONE:
-            if print_msgs:
-                print "\t" * depth, depth, ": Trying ", str(move)
-            # analyse_state(next_state.transition_board)
-            t0 = time.time()
-            val = max(val, alpha_beta_min(next_state.transition_board, alpha, beta,
-                                          avail_time, depth - 1))
-            t1 = time.time()
-            difference = t1 - t0
-            avail_time -= difference
-            if avail_time <= common_threshold:
-                return val
-
-            if val > beta:
-                if print_msgs:
-                    print depth, " : PRUNED!"
-                return val
-            alpha = max(alpha, val)
-    return val
-
-"""#######################################################################################
-########################################## MIN-MAX #######################################
-#######################################################################################"""
-
-
-def min_max(state):
-    """
-    implements mini-max algorithm on the given state
-    :param state: instance of Board representing a state of the game
-    :return: an instance of Move
-    """
-    legal_moves = state.current_player.legal_moves
-    best_move = legal_moves[0]
-    best_score = float("-inf")
-    for move in legal_moves:
-        next_state = state.current_player.make_move(move)
-        if next_state.move_status == MoveStatus.DONE:
-            # analyse_state(next_state.transition_board)
-            score = minimizer(next_state.transition_board)
-            if score > best_score:
-                best_score = score
-                best_move = move
-    return best_move
-
-
-def minimizer(state, depth=1):
-    """
-    minimizer node analyzing the opponents moves
-    :param state: instance of Board representing a state of the game
-    :param depth: an integer value representing how deep into the search tree minimax goes
-    :return: an integer value that chooses the minimum from the child nodes
-    """
-    my_piece, other_piece = get_current_and_opponent_players(state)
-    if depth == max_depth:
-        return (5 / depth) * evaluate_state(my_piece, other_piece)
-    legal_moves = state.current_player.legal_moves
-    best_score = float("inf")
-    for move in legal_moves:
-        next_state = state.current_player.make_move(move)
-        if next_state.move_status == MoveStatus.DONE:
-            # analyse_state(next_state.transition_board)
-            score = maximizer(next_state.transition_board, depth + 1)
-            if score < best_score:
-                best_score = score
-    return best_score
-
-
-def maximizer(state, depth=1):
-    """
-    maximizer node analyzing the opponents moves
-    :param state: instance of Board representing a state of the game
-    :param depth: an integer value representing how deep into the search tree minimax goes
-    :return: an integer value that chooses the maximum from the child nodes
-    """
-    my_piece, other_piece = get_current_and_opponent_players(state)
-    if depth == max_depth:
-        return (5 / depth) * evaluate_state(my_piece, other_piece)
-    legal_moves = state.current_player.legal_moves
-    best_score = float("-inf")
-    for move in legal_moves:
-        next_state = state.current_player.make_move(move)
-        if next_state.move_status == MoveStatus.DONE:
-            # analyse_state(next_state.transition_board)
-            score = minimizer(next_state.transition_board, depth + 1)
-            if score > best_score:
-                best_score = score
-    return best_score
-
-
-"""#######################################################################################
-#######################################################################################"""
+            print search_time
+        alicesearch.search_result = (0, None)
+        emit_held_result()
+        return ponder_result
+    timer.stop()
+    thread.join()
+    ponder_result = None
+    return None
 
 
 def generate_move_sentence(move):
@@ -267,38 +107,128 @@ def generate_move_sentence(move):
 def choose_move():
     """
     looks at all legal moves and implements a search algorithm to find best move
-    :return: an instance of Move
+    :return: an instance of Move or None if a message of the referee ended the game
+             during the search
     """
+    global search_time
     player_legal_moves = game.current_player.legal_moves
     if len(player_legal_moves) == 0:
         sys.stdout.write(my_team_color + " surrenders\n")
+        finish_record(GameResult.winner(game.current_player.get_opponent().get_color()))
         sys.exit(0)
-    t0 = time.time()
-    # move = min_max(game)
-    move = alpha_beta_pruning(game)
-    t1 = time.time()
-    times.append(t1 - t0)
+    if profiler is not None:
+        profiler.start()
+    alicesearch.search_result = (0, None)
+    timer.start()
+    move = book_move(game)
+    if move is None:
+        # move = min_max(game)
+        move = alpha_beta_pruning(game)
+    search_time = timer.finish()
+    if profiler is not None:
+        profiler.stop()
     if print_msgs:
-        print times[-1]
+        print search_time
+    if reader.interrupt.is_set():
+        return None
     # move_index = random.randrange(len(player_legal_moves))
     # move = player_legal_moves[move_index]
     return move
 
 
-def make_move(move):
+def book_move(state):
+    """
+    picks one of the book moves of the given state, better moves more often
+    :param state: instance of Board representing a state of the game
+    :return: an instance of Move or None if the state isn't in the book
+    """
+    if opening_book is None:
+        return None
+    candidates = []
+    for move_key, weight in opening_book.probe(state.hash_key):
+        for move in state.current_player.legal_moves:
+            if move.get_key() == move_key and \
+                    state.current_player.make_move(move).move_status == MoveStatus.DONE:
+                candidates.append((move, weight))
+    if len(candidates) == 0:
+        return None
+    pick = random.randrange(sum(weight for move, weight in candidates))
+    for move, weight in candidates:
+        if pick < weight:
+            return move
+        pick -= weight
+
+
+def make_move(move, searched=False):
     """
     implements a move on the current game state
     :param move: an instance of Move
+    :param searched: True if our search chose the move
     :return: an updated instance of Board after implementing Move
     """
     move_transition = game.current_player.make_move(move)
     if not move_transition.move_status == MoveStatus.DONE:
         sys.stdout.write(my_team_color + " surrenders\n")
         # debug.write("move_transition.move_status != MoveStatus.DONE")
+        finish_record(GameResult.winner(game.current_player.get_opponent().get_color()))
         sys.exit(0)
+    record_move(move, searched)
+    remember_position(move_transition.transition_board)
     return move_transition.transition_board
 
 
+def start_record():
+    """
+    starts recording the game, the opening moves included
+    """
+    if recorder is None:
+        return
+    recorder.start_game(time.time())
+    if options.opening:
+        for move_key in options.opening.split(","):
+            recorder.add_move(int(move_key))
+
+
+def record_move(move, searched):
+    """
+    appends a move to the game record
+    :param move: an instance of Move made in the game
+    :param searched: True if our search chose the move, its score, depth and time are
+                     recorded along with it
+    """
+    if recorder is None:
+        return
+    if searched:
+        depth, score = alicesearch.search_result
+        recorder.add_move(move.get_key(), score, depth, search_time)
+    else:
+        recorder.add_move(move.get_key())
+
+
+def finish_record(result):
+    """
+    stores the result of the recorded game
+    :param result: GameResult of the game
+    """
+    if recorder is not None:
+        recorder.finish_game(result)
+
+
+def game_result(message):
+    """
+    reads the result of the game from a message of the referee
+    :param message: a message announcing the end of the game
+    :return: GameResult of the game
+    """
+    color = message.split()[0]
+    if "wins" in message:
+        return GameResult.winner(color)
+    if "loses" in message:
+        return GameResult.winner(PlayerColor.White if color == PlayerColor.Black
+                                 else PlayerColor.Black)
+    return GameResult.DRAWN
+
+
 def choose_random_move(game):
     """
     chooses a random doable move
@@ -364,66 +294,230 @@ def create_custom_board():
     return builder.build()
 
 
-end = False
-game = Board.create_standard_board()
-# game = create_custom_board()
+parser = argparse.ArgumentParser(description="Alice Chess engine playing against a referee")
+parser.add_argument("--time", type=float, default=60.0,
+                    help="seconds on our clock at the start of the game")
+parser.add_argument("--increment", type=float, default=0.0,
+                    help="seconds added to our clock after every move")
+parser.add_argument("--ponder", action="store_true",
+                    help="keep searching on the opponent's time")
+parser.add_argument("--smp", type=int, default=0,
+                    help="number of helper processes searching with a shared "
+                         "transposition table")
+parser.add_argument("--workers", type=int, default=0,
+                    help="number of worker processes the root moves are split across")
+parser.add_argument("--eval-cache", type=int, default=2 ** 16, metavar="SIZE",
+                    help="number of evaluations the evaluation cache holds, 0 to disable it")
+parser.add_argument("--pawn-table", type=int, default=2 ** 12, metavar="SIZE",
+                    help="number of pawn structures the pawn table holds, 0 to disable it")
+parser.add_argument("--search", choices=["alphabeta", "minimax"], default="alphabeta",
+                    help="search function choosing our moves")
+parser.add_argument("--depth", type=int,
+                    help="depth every move is searched to, within the time on our clock")
+parser.add_argument("--disable-term", action="append", default=[], metavar="TERM",
+                    choices=evaluation_term_names,
+                    help="leave an evaluation term out, one of " +
+                         ", ".join(evaluation_term_names) + "; may be repeated")
+parser.add_argument("--bench-split", type=int, metavar="DEPTH",
+                    help="compare serial and root-split search at DEPTH and exit")
+parser.add_argument("--book", metavar="PATH", help="opening book to play from")
+parser.add_argument("--build-book", metavar="PATH",
+                    help="build an opening book on a process pool and exit")
+parser.add_argument("--book-plies", type=int, default=4,
+                    help="number of plies covered by a built opening book")
+parser.add_argument("--book-depth", type=int, default=2,
+                    help="search depth of the states in a built opening book")
+parser.add_argument("--book-width", type=int, default=3,
+                    help="number of best moves searched, and weighted by their scores, "
+                         "in every state of a built opening book")
+parser.add_argument("--opening", metavar="KEYS",
+                    help="comma separated keys of the moves played from the standard "
+                         "board before the game starts")
+parser.add_argument("--analyse", metavar="PATH",
+                    help="analyse the positions in PATH, one per line in the notation of "
+                         "Board.to_notation or - for stdin, write JSON lines and exit")
+parser.add_argument("--analyse-binary", action="store_true",
+                    help="the positions to analyse are the 65 byte encodings of "
+                         "Board.to_bytes one after another instead of lines")
+parser.add_argument("--analyse-output", metavar="PATH", default="-",
+                    help="file the analysis is written to and resumed from, - for stdout")
+parser.add_argument("--analyse-depth", type=int, default=3,
+                    help="depth every position is analysed to")
+parser.add_argument("--analyse-lines", type=int, default=1, metavar="COUNT",
+                    help="number of best moves analysed with their principal variations")
+parser.add_argument("--analyse-time", type=float, metavar="SECONDS",
+                    help="seconds every position is analysed for instead of a fixed depth")
+parser.add_argument("--record", metavar="PATH",
+                    help="append the games played to the game archive PATH")
+parser.add_argument("--stats", metavar="PATH",
+                    help="append search statistics as JSON lines to PATH, - for stderr")
+parser.add_argument("--profile", metavar="DIRECTORY",
+                    default=os.environ.get("ALICE_PROFILE"),
+                    help="write a pstats file and collapsed stacks of every profiled move "
+                         "to DIRECTORY, defaults to $ALICE_PROFILE")
+parser.add_argument("--profile-moves", metavar="RANGE",
+                    default=os.environ.get("ALICE_PROFILE_MOVES"),
+                    help="our moves to profile like 5-10, 5- or 7, defaults to "
+                         "$ALICE_PROFILE_MOVES or all the moves")
+parser.add_argument("--tablebases", metavar="DIRECTORY",
+                    help="directory of endgame tablebases written by alicetablebase.py")
+
+options = None
+game = None
 my_team_color = None
-my_team = None
-debug = open('debug.txt', 'w')
-max_depth = 2
-times = [1]
-avg_time_constant = 1
-while not end:
-    input_message = raw_input()
-    if "you are " in input_message:
-        if "black" in input_message:
-            my_team_color = PlayerColor.Black
-            my_team = game.black_player
-        else:
-            my_team_color = PlayerColor.White
-            my_team = game.white_player
-            # analyse_state(game)
-            move = choose_move()
-            game = make_move(move)
-            sys.stdout.write(generate_move_sentence(move))
-
-    elif "moves" in input_message:
-        message = input_message.split()
-        assert game.current_player.get_color() == message[0]
-        move = text_to_move(game.current_player.legal_moves, message[2], message[4],
-                            message[5], message[7])
-        game = make_move(move)
-        if game.current_player.get_color() == my_team.get_color():
-            move = choose_move()
-            game = make_move(move)
-            sys.stdout.write(generate_move_sentence(move))
-            # debug.write("move occured\n")
+search_time = 0.0
+recorder = None
+opening_book = None
+profiler = None
+reader = None
+ponder_thread = None
+ponder_move = None
+ponder_state = None
+ponder_result = None
+
+
+def main():
+    """
+    plays a game against the referee, or builds a book, analyses positions or
+    benchmarks the split search as the options ask
+    """
+    global options, game, my_team_color, recorder, opening_book, profiler, reader
+    options = parser.parse_args()
+    statistics_sink = None
+    if options.stats == "-":
+        statistics_sink = sys.stderr
+    elif options.stats is not None:
+        statistics_sink = open(options.stats, "a")
+    split_workers = options.workers
+    if options.build_book is not None or options.analyse is not None:
+        split_workers = 0
+    elif options.bench_split is not None and split_workers == 0:
+        split_workers = multiprocessing.cpu_count()
+    configure(options.time, options.increment, options.smp, split_workers,
+              options.eval_cache, options.pawn_table, options.tablebases, statistics_sink,
+              search=options.search, depth=options.depth,
+              disabled_terms=options.disable_term)
+    if options.build_book is not None:
+        build_book(options.build_book,
+                   functools.partial(book_search, depth=options.book_depth,
+                                     lines=options.book_width),
+                   multiprocessing.Pool(options.workers or multiprocessing.cpu_count()),
+                   options.book_plies, options.book_width)
+        sys.exit(0)
+    if options.analyse is not None:
+        if options.analyse_time is not None:
+            limits = SearchLimits(None, options.analyse_time, options.analyse_lines)
         else:
-            sys.stdout.write(my_team_color + " surrenders\n")
-            # debug.write("because game.current_player.get_color() != my_team.get_color()")
-        """
-        analyse_state(game)
-        print game.current_player.legal_moves
-        print game
-        message1 = raw_input()
-        message1 = message1.split()
-        assert game.current_player.get_color() == message1[0]
-        move = text_to_move(game.current_player.legal_moves, message1[2], message1[4],
-                            message1[5], message1[7])
-        game = make_move(move)
-        """
-
-    elif "wins" in input_message or "loses" in input_message or "drawn" in input_message:
-        end = True
+            limits = SearchLimits(options.analyse_depth, None, options.analyse_lines)
+        analysis_workers = options.workers or multiprocessing.cpu_count()
+        analyse_positions(options.analyse, options.analyse_output,
+                          multiprocessing.Pool(analysis_workers), 2 * analysis_workers,
+                          limits, options.analyse_binary)
         sys.exit(0)
-
-    elif " offers draw" in input_message:
-        sys.stdout.write(my_team_color + " accepts draw\n")
-        end = True
+    if options.bench_split is not None:
+        benchmark_root_split(options.bench_split)
         sys.exit(0)
-    # print choose_move()
-    # analyse_state(game)
-    if print_msgs:
-        print game
-    sys.stdin.flush()
-    sys.stdout.flush()
+    end = False
+    game = Board.create_standard_board()
+    remember_position(game)
+    if options.opening:
+        opening_keys = [int(move_key) for move_key in options.opening.split(",")]
+        for ply in range(1, len(opening_keys) + 1):
+            game = play_moves(opening_keys[:ply])
+            remember_position(game)
+    # game = create_custom_board()
+    my_team = None
+    if options.record is not None:
+        recorder = GameRecordWriter(options.record)
+    if options.book is not None:
+        opening_book = OpeningBook(options.book)
+    profiler = MoveProfiler.from_settings(options.profile, options.profile_moves)
+    reader = ProtocolReader(sys.stdin)
+    timer.set_interrupt_event(reader.interrupt)
+    reader.start()
+    while not end:
+        moved = False
+        input_message = reader.get()
+        if input_message is None:
+            stop_pondering(None)
+            end = True
+            sys.exit(0)
+        if "you are " in input_message:
+            if "black" in input_message:
+                my_team_color = PlayerColor.Black
+                my_team = game.black_player
+            else:
+                my_team_color = PlayerColor.White
+                my_team = game.white_player
+            start_record()
+            if game.current_player.get_color() == my_team_color:
+                # analyse_state(game)
+                move = choose_move()
+                if move is not None:
+                    game = make_move(move, True)
+                    sys.stdout.write(generate_move_sentence(move))
+                    moved = True
+
+        elif "moves" in input_message:
+            message = input_message.split()
+            assert game.current_player.get_color() == message[0]
+            move = text_to_move(game.current_player.legal_moves, message[2], message[4],
+                                message[5], message[7])
+            ponder_reply = stop_pondering(move)
+            if ponder_reply is not None:
+                record_move(move, False)
+                game = ponder_state
+                remember_position(game)
+            else:
+                game = make_move(move)
+            if game.current_player.get_color() == my_team.get_color():
+                move = ponder_reply if ponder_reply is not None else choose_move()
+                if move is not None:
+                    game = make_move(move, True)
+                    sys.stdout.write(generate_move_sentence(move))
+                    moved = True
+                # debug.write("move occured\n")
+            else:
+                sys.stdout.write(my_team_color + " surrenders\n")
+                # debug.write("because game.current_player.get_color() != my_team.get_color()")
+            """
+            analyse_state(game)
+            print game.current_player.legal_moves
+            print game
+            message1 = raw_input()
+            message1 = message1.split()
+            assert game.current_player.get_color() == message1[0]
+            move = text_to_move(game.current_player.legal_moves, message1[2], message1[4],
+                                message1[5], message1[7])
+            game = make_move(move)
+            """
+
+        elif input_message.startswith("time "):
+            clock = input_message.split()
+            timer.update_clock(float(clock[1]), float(clock[2]) if len(clock) > 2 else None)
+            continue
+
+        elif "wins" in input_message or "loses" in input_message or \
+                "drawn" in input_message:
+            stop_pondering(None)
+            finish_record(game_result(input_message))
+            end = True
+            sys.exit(0)
+
+        elif " offers draw" in input_message:
+            stop_pondering(None)
+            sys.stdout.write(my_team_color + " accepts draw\n")
+            finish_record(GameResult.DRAWN)
+            end = True
+            sys.exit(0)
+        # print choose_move()
+        # analyse_state(game)
+        if print_msgs:
+            print game
+        sys.stdout.flush()
+        if options.ponder and moved:
+            start_pondering()
+
+
+if __name__ == "__main__":
+    main()
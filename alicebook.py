@@ -0,0 +1,154 @@
+"""Implements an opening book for the Alice Chess Engine"""
+import mmap
+import struct
+from aliceengine import *
+
+
+class OpeningBook:
+    __doc__ = "An opening book stored as a file of (hash key, move key, weight) records " \
+              "sorted by hash key. The file is memory mapped, so every engine process " \
+              "reading the same book shares its pages."
+    MAGIC = "ALICEBK1"
+    HEADER = struct.Struct(">8sI")
+    RECORD = struct.Struct(">QHH")
+
+    def __init__(self, path):
+        """
+        Opens a book written by OpeningBook.write
+        :param path: path of the book file
+        """
+        self.book_file = open(path, "rb")
+        self.data = mmap.mmap(self.book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = OpeningBook.HEADER.unpack_from(self.data, 0)
+        if magic != OpeningBook.MAGIC:
+            raise Exception("Value Error: " + path + " is not an opening book.")
+
+    def record(self, index):
+        """
+        reads a record of the book
+        :param index: non negative integer smaller than the number of records
+        :return: tuple of (hash key, move key, weight)
+        """
+        return OpeningBook.RECORD.unpack_from(self.data, OpeningBook.HEADER.size +
+                                              index * OpeningBook.RECORD.size)
+
+    def probe(self, hash_key):
+        """
+        looks up the book moves of a state with a binary search
+        :param hash_key: hash key of the state
+        :return: list of tuples of (move key, weight), empty if the state isn't in the book
+        """
+        low = 0
+        high = self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] < hash_key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        while low < self.size:
+            record_key, move_key, weight = self.record(low)
+            if record_key != hash_key:
+                break
+            moves.append((move_key, weight))
+            low += 1
+        return moves
+
+    def close(self):
+        """
+        unmaps and closes the book file
+        """
+        self.data.close()
+        self.book_file.close()
+
+    @staticmethod
+    def write(path, records):
+        """
+        writes a book file
+        :param path: path of the book file
+        :param records: list of tuples of (hash key, move key, weight)
+        """
+        records = sorted(records)
+        book_file = open(path, "wb")
+        book_file.write(OpeningBook.HEADER.pack(OpeningBook.MAGIC, len(records)))
+        for hash_key, move_key, weight in records:
+            book_file.write(OpeningBook.RECORD.pack(hash_key, move_key,
+                                                    min(weight, 0xFFFF)))
+        book_file.close()
+
+
+def play_moves(move_keys):
+    """
+    plays moves from the standard board
+    :param move_keys: list of keys of the moves to play in order
+    :return: an instance of Board after the moves
+    """
+    state = Board.create_standard_board()
+    for move_key in move_keys:
+        for move in state.current_player.legal_moves:
+            if move.get_key() == move_key:
+                transition = state.current_player.make_move(move)
+                if transition.move_status != MoveStatus.DONE:
+                    raise Exception("Value Error: " + str(move_key) + " is not a legal "
+                                    "move: " + transition.move_status + ".")
+                state = transition.transition_board
+                break
+        else:
+            raise Exception("Value Error: " + str(move_key) + " is not a legal move.")
+    return state
+
+
+def build_book(path, search, pool, plies=4, width=3, margin=10):
+    """
+    builds a book by searching the early states of the game on a process pool. Every
+    state reached within the given number of plies is searched for its best moves, and
+    those scoring within the margin of the best one are recorded as alternatives. The
+    best move weighs margin + 1 and every other one a point less per point of score it
+    gives away, so book_move picks the best moves most often. The states after the
+    recorded moves, and after the best looking moves up to width moves in all, are
+    searched on the next ply.
+    :param path: path of the book file
+    :param search: function taking a list of move keys played from the standard board
+                   and returning a list of tuples of the key of a move and its score for
+                   the best moves in the state they lead to, best first, empty if there
+                   is no move. Runs in the pool, so it has to be picklable.
+    :param pool: multiprocessing.Pool the searches run on
+    :param plies: number of plies from the standard board covered by the book
+    :param width: number of moves followed from every state
+    :param margin: largest loss of score of a move recorded next to the best one, a
+                   pawn being worth 10
+    """
+    weights = {}
+    lines = [[]]
+    seen = set()
+    for ply in range(plies):
+        next_lines = []
+        for line, ranking in zip(lines, pool.map(search, lines)):
+            if len(ranking) == 0:
+                continue
+            state = play_moves(line)
+            best_score = ranking[0][1]
+            followed = []
+            for move_key, score in ranking:
+                loss = 0 if score == best_score else best_score - score
+                if loss > margin:
+                    break
+                weights[(state.hash_key, move_key)] = max(1, int(round(margin + 1 - loss)))
+                followed.append(move_key)
+            candidates = sorted(state.current_player.legal_moves,
+                                key=lambda move: move.value, reverse=True)
+            for move in candidates:
+                if len(followed) >= width:
+                    break
+                if move.get_key() not in followed and \
+                        state.current_player.make_move(move).move_status == MoveStatus.DONE:
+                    followed.append(move.get_key())
+            for move_key in followed:
+                next_state = play_moves(line + [move_key])
+                if next_state.hash_key not in seen:
+                    seen.add(next_state.hash_key)
+                    next_lines.append(line + [move_key])
+        lines = next_lines
+    OpeningBook.write(path, [(hash_key, move_key, weight) for (hash_key, move_key), weight
+                             in weights.items()])
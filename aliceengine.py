@@ -1,5 +1,7 @@
 """Implements an Alice Chess Engine"""
-from copy import deepcopy
+import weakref
+from copy import copy
+import random
 
 class Position:
     __doc__ = "A composite class for a position on board. Consists of a board and index."
@@ -200,6 +202,44 @@ class BoardProperties:
 BoardProperties = BoardProperties()
 
 
+class ZobristKeys:
+    __doc__ = "A wrapper class for the random keys used to hash a state of the game"
+    SEED = 5500
+
+    def __init__(self):
+        """
+        Initializer of this class. Draws a key for every piece on every tile of both
+        boards, for pawns which haven't moved yet and for the player to move. The keys
+        are drawn from a fixed seed so that hash keys are the same in every process.
+        """
+        generator = random.Random(ZobristKeys.SEED)
+        self.piece_keys = {}
+        for symbol in "KQBNRPkqbnrp":
+            for board in [BoardIndex.Board_One, BoardIndex.Board_Two]:
+                self.piece_keys[(symbol, board)] = [generator.getrandbits(64) for _ in
+                                                    range(BoardProperties.NUM_TILES)]
+        self.first_move_keys = {}
+        for board in [BoardIndex.Board_One, BoardIndex.Board_Two]:
+            self.first_move_keys[board] = [generator.getrandbits(64) for _ in
+                                           range(BoardProperties.NUM_TILES)]
+        self.black_to_move_key = generator.getrandbits(64)
+
+    def piece_key(self, piece):
+        """
+        gives the key of a piece standing at its position
+        :param piece: instance of Piece
+        :return: 64 bit integer key
+        """
+        position = piece.position
+        key = self.piece_keys[(str(piece), position.board)][position.index]
+        if piece.is_first_move:
+            key ^= self.first_move_keys[position.board][position.index]
+        return key
+
+
+ZobristKeys = ZobristKeys()
+
+
 class Tile:
     __doc__ = "Abstract class for a tile on board configuration"
 
@@ -292,6 +332,86 @@ class OccupiedTile(Tile):
         return self.piece
 
 
+class GameBoard:
+    __doc__ = "An immutable game board of 64 tiles kept as 8 rows. A game board made by " \
+              "changing a few tiles of another one shares the unchanged rows with it, so " \
+              "a new game board only costs as much as the rows which changed."
+    EMPTY_TILES = Tile.all_possible_tiles()
+
+    def __init__(self, rows):
+        """
+        Initializes the game board with its rows
+        :param rows: tuple of 8 tuples of 8 tiles, from the 8th rank down
+        """
+        self.rows = rows
+
+    @staticmethod
+    def create_row(board_config, row):
+        """
+        creates the tiles of a row of a game board
+        :param board_config: dictionary of configuration on the game board
+        :param row: index of the row
+        :return: tuple of the tiles of the row
+        """
+        tiles = []
+        start = row * BoardProperties.NUM_TILES_PER_ROW
+        for i in range(start, start + BoardProperties.NUM_TILES_PER_ROW):
+            if isinstance(board_config[i], Piece):
+                tiles.append(OccupiedTile(i, board_config[i]))
+            else:
+                tiles.append(GameBoard.EMPTY_TILES[i])
+        return tuple(tiles)
+
+    @staticmethod
+    def create(board_config):
+        """
+        creates a game board from scratch
+        :param board_config: dictionary of configuration on the game board
+        :return: instance of GameBoard
+        """
+        return GameBoard(tuple(GameBoard.create_row(board_config, row)
+                               for row in range(BoardProperties.NUM_TILES_PER_ROW)))
+
+    def update(self, board_config, changed_indices):
+        """
+        creates a game board which differs from this one only at some tiles
+        :param board_config: dictionary of configuration on the new game board
+        :param changed_indices: indexes of the tiles which may differ
+        :return: instance of GameBoard sharing the unchanged rows with this one
+        """
+        rows = list(self.rows)
+        for row in set(index // BoardProperties.NUM_TILES_PER_ROW
+                       for index in changed_indices):
+            rows[row] = GameBoard.create_row(board_config, row)
+        return GameBoard(tuple(rows))
+
+    def __getitem__(self, index):
+        """
+        gets a tile, or a list of tiles for a slice
+        :param index: non negative integer smaller than 64 or a slice
+        :return: instance of Tile class or list of them
+        """
+        if isinstance(index, slice):
+            return list(self)[index]
+        return self.rows[index // BoardProperties.NUM_TILES_PER_ROW][
+            index % BoardProperties.NUM_TILES_PER_ROW]
+
+    def __iter__(self):
+        """
+        iterates over the tiles from a8 to h1
+        :return: iterator of instances of Tile class
+        """
+        for row in self.rows:
+            for tile in row:
+                yield tile
+
+    def __len__(self):
+        """
+        :return: number of tiles of the game board
+        """
+        return BoardProperties.NUM_TILES
+
+
 class Board:
     __doc__ = "Represents a full game on the table. Consists of all the information " \
               "necessary to represent a game of Alice Chess."
@@ -306,8 +426,15 @@ class Board:
         :param builder: Instance of the BoardBuilder class
         """
         self.builder = builder
-        self.game_board1 = Board.create_game_board(builder.board_config1)
-        self.game_board2 = Board.create_game_board(builder.board_config2)
+        previous_board = builder.previous_board
+        if previous_board is None:
+            self.game_board1 = GameBoard.create(builder.board_config1)
+            self.game_board2 = GameBoard.create(builder.board_config2)
+        else:
+            self.game_board1 = previous_board.game_board1.update(builder.board_config1,
+                                                                 builder.changed_indices)
+            self.game_board2 = previous_board.game_board2.update(builder.board_config2,
+                                                                 builder.changed_indices)
         self.white_piece = Board.calculate_active_piece(self.game_board1,
                                                         PlayerColor.White) + \
                            Board.calculate_active_piece(self.game_board2,
@@ -316,30 +443,30 @@ class Board:
                                                         PlayerColor.Black) + \
                            Board.calculate_active_piece(self.game_board2,
                                                         PlayerColor.Black)
+        self.piece_moves = {}
         white_legal_moves = self.calculate_moves(self.white_piece)
         black_legal_moves = self.calculate_moves(self.black_piece)
+        if previous_board is None:
+            self.white_attack_map = Player.calculate_attack_map(white_legal_moves)
+            self.black_attack_map = Player.calculate_attack_map(black_legal_moves)
+        else:
+            self.white_attack_map = self.update_attack_map(previous_board.white_attack_map,
+                                                           previous_board.white_piece,
+                                                           self.white_piece)
+            self.black_attack_map = self.update_attack_map(previous_board.black_attack_map,
+                                                           previous_board.black_piece,
+                                                           self.black_piece)
+        builder.previous_board = None
         self.white_player = WhitePlayer(self, white_legal_moves,
-                                        black_legal_moves)
+                                        black_legal_moves, self.black_attack_map)
         self.black_player = BlackPlayer(self, black_legal_moves,
-                                        white_legal_moves)
+                                        white_legal_moves, self.white_attack_map)
         self.current_player = PlayerColor.opponent(builder.next_move_maker,
                                                    self.white_player,
                                                    self.black_player)
-
-    @staticmethod
-    def create_game_board(board_config):
-        """
-        creates a list of all the tiles on given game board
-        :param board_config: dictionary of configuration on this board
-        :return: list of suitable tiles on this board
-        """
-        board_tiles = [None] * BoardProperties.NUM_TILES
-        for i in range(BoardProperties.NUM_TILES):
-            if isinstance(board_config[i], Piece):
-                board_tiles[i] = OccupiedTile(i, board_config[i])
-            else:
-                board_tiles[i] = EmptyTile(i)
-        return board_tiles
+        self.hash_key = Board.calculate_hash_key(self.white_piece + self.black_piece,
+                                                 self.current_player.get_color())
+        self.pawn_key = Board.calculate_pawn_key(self.white_piece + self.black_piece)
 
     def get_tile(self, coordinate):
         """
@@ -351,7 +478,16 @@ class Board:
             game_board = self.game_board1
         else:
             game_board = self.game_board2
-        return game_board[coordinate.index]
+        return game_board.rows[coordinate.index // BoardProperties.NUM_TILES_PER_ROW][
+            coordinate.index % BoardProperties.NUM_TILES_PER_ROW]
+
+    def apply(self, move):
+        """
+        makes a Move on this game without checking if it is legal
+        :param move: Move of a piece of the player who moves next
+        :return: new instance of Board after the Move
+        """
+        return move.execute_move(self)
 
     @staticmethod
     def create_standard_board():
@@ -398,11 +534,187 @@ class Board:
         builder.set_next_move_maker(PlayerColor.Black)
         return builder.build()
 
+    def to_notation(self):
+        """
+        writes this game in a FEN like notation: the placement of the first board and of
+        the second board from the 8th rank down, the player to move and, for every
+        board, the files of the Pawns on their starting rank which haven't made their
+        first move, uppercase for white and lowercase for black.
+        For Example: the standard board is written as
+        rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 8/8/8/8/8/8/8/8 w abcdefghABCDEFGH/-
+        :return: string in the notation
+        """
+        placements = []
+        flags = []
+        for game_board in [self.game_board1, self.game_board2]:
+            ranks = []
+            board_flags = ""
+            for row in range(BoardProperties.NUM_TILES_PER_ROW):
+                rank = ""
+                empty = 0
+                for tile in game_board.rows[row]:
+                    if not tile.is_occupied():
+                        empty += 1
+                        continue
+                    if empty > 0:
+                        rank += str(empty)
+                        empty = 0
+                    rank += str(tile.get_piece())
+                if empty > 0:
+                    rank += str(empty)
+                ranks.append(rank)
+            for tile in game_board:
+                piece = tile.get_piece()
+                if isinstance(piece, Pawn) and piece.is_first_move and \
+                        piece.position.index in Board.starting_rank(piece.color):
+                    chess_file = Position.int_to_alg(piece.position.index)[0]
+                    board_flags += chess_file.upper() if piece.color == PlayerColor.White \
+                        else chess_file
+            placements.append("/".join(ranks))
+            flags.append(board_flags or "-")
+        side = "w" if self.current_player.get_color() == PlayerColor.White else "b"
+        return " ".join(placements + [side, "/".join(flags)])
+
+    @staticmethod
+    def from_notation(notation):
+        """
+        creates a game written by to_notation
+        :param notation: string in the notation of to_notation
+        :return: an instance of Board
+        """
+        fields = notation.split()
+        if len(fields) != 4 or fields[2] not in ["w", "b"] or len(fields[3].split("/")) != 2:
+            raise Exception("Value Error: " + notation + " is not a valid notation.")
+        piece_classes = {"k": King, "q": Queen, "r": Rook, "b": Bishop, "n": Knight,
+                         "p": Pawn}
+        builder = BoardBuilder()
+        boards = [BoardIndex.Board_One, BoardIndex.Board_Two]
+        for board, placement, board_flags in zip(boards, fields[:2], fields[3].split("/")):
+            ranks = placement.split("/")
+            if len(ranks) != BoardProperties.NUM_TILES_PER_ROW:
+                raise Exception("Value Error: " + placement + " doesn't have 8 ranks.")
+            for row, rank in enumerate(ranks):
+                index = row * BoardProperties.NUM_TILES_PER_ROW
+                for symbol in rank:
+                    if symbol.isdigit():
+                        index += int(symbol)
+                        continue
+                    if symbol.lower() not in piece_classes or \
+                            index >= (row + 1) * BoardProperties.NUM_TILES_PER_ROW:
+                        raise Exception("Value Error: " + rank + " is not a valid rank.")
+                    color = PlayerColor.White if symbol.isupper() else PlayerColor.Black
+                    position = Position(board, index)
+                    if symbol.lower() == "p":
+                        chess_file = Position.int_to_alg(index)[0]
+                        first_move = (chess_file.upper() if color == PlayerColor.White
+                                      else chess_file) in board_flags and \
+                            index in Board.starting_rank(color)
+                        builder.set_piece(Pawn(position, color, first_move))
+                    else:
+                        builder.set_piece(piece_classes[symbol.lower()](position, color))
+                    index += 1
+                if index != (row + 1) * BoardProperties.NUM_TILES_PER_ROW:
+                    raise Exception("Value Error: " + rank + " is not a valid rank.")
+        if fields[2] == "w":
+            builder.set_next_move_maker(PlayerColor.Black)
+        else:
+            builder.set_next_move_maker(PlayerColor.White)
+        return builder.build()
+
+    def to_bytes(self):
+        """
+        writes this game in a binary encoding of 65 bytes. Byte i holds the tile at index
+        i of the first board in its high half and of the second board in its low half:
+        0 for an empty tile, 1 to 6 for a white King, Queen, Rook, Bishop, Knight or Pawn,
+        7 for a white Pawn which hasn't made its first move and 8 more for black. The
+        last byte is 0 if white moves next else 1.
+        :return: string of 65 bytes
+        """
+        data = bytearray(BoardProperties.NUM_TILES + 1)
+        for piece in self.white_piece + self.black_piece:
+            code = 1 + "kqrbnp".index(str(piece).lower())
+            if isinstance(piece, Pawn) and piece.is_first_move:
+                code += 1
+            if piece.color == PlayerColor.Black:
+                code += 8
+            if piece.position.board == BoardIndex.Board_One:
+                code <<= 4
+            data[piece.position.index] |= code
+        if self.current_player.get_color() == PlayerColor.Black:
+            data[BoardProperties.NUM_TILES] = 1
+        return str(data)
+
+    @staticmethod
+    def builder_from_bytes(data):
+        """
+        reads a game written by to_bytes
+        :param data: string returned by to_bytes
+        :return: an instance of BoardBuilder holding the game
+        """
+        if len(data) != BoardProperties.NUM_TILES + 1:
+            raise Exception("Value Error: " + repr(data) + " is not a valid encoding.")
+        piece_classes = [None, King, Queen, Rook, Bishop, Knight, Pawn, Pawn]
+        data = bytearray(data)
+        builder = BoardBuilder()
+        for index in range(BoardProperties.NUM_TILES):
+            for board, code in [(BoardIndex.Board_One, data[index] >> 4),
+                                (BoardIndex.Board_Two, data[index] & 15)]:
+                if code & 7 == 0:
+                    if code != 0:
+                        raise Exception("Value Error: " + repr(str(data)) +
+                                        " is not a valid encoding.")
+                    continue
+                color = PlayerColor.Black if code & 8 else PlayerColor.White
+                piece_class = piece_classes[code & 7]
+                if piece_class == Pawn:
+                    builder.set_piece(Pawn(Position(board, index), color, code & 7 == 7))
+                else:
+                    builder.set_piece(piece_class(Position(board, index), color))
+        if data[BoardProperties.NUM_TILES] == 0:
+            builder.set_next_move_maker(PlayerColor.Black)
+        else:
+            builder.set_next_move_maker(PlayerColor.White)
+        return builder
+
+    @staticmethod
+    def from_bytes(data):
+        """
+        creates a game written by to_bytes
+        :param data: string returned by to_bytes
+        :return: an instance of Board
+        """
+        return Board.builder_from_bytes(data).build()
+
+    def __getstate__(self):
+        """
+        pickles this game as its binary encoding instead of all of its players and moves
+        :return: string returned by to_bytes
+        """
+        return self.to_bytes()
+
+    def __setstate__(self, state):
+        """
+        unpickles a game pickled by __getstate__
+        :param state: string returned by to_bytes
+        """
+        Board.__init__(self, Board.builder_from_bytes(state))
+
+    @staticmethod
+    def starting_rank(color):
+        """
+        gives the indexes of the starting rank of the Pawns of a player
+        :param color: color of the player
+        :return: list of indexes
+        """
+        if color == PlayerColor.White:
+            return range(48, 56)
+        return range(8, 16)
+
     @staticmethod
     def calculate_active_piece(gameboard, color):
         """
         generates a list of all the active pieces of a given player
-        :param gameboard: list of all the tiles on a game board
+        :param gameboard: GameBoard of the tiles
         :param color: color of the player
         :return: list of all the active(non-dead) pieces
         """
@@ -415,17 +727,82 @@ class Board:
 
         return pieces
 
+    @staticmethod
+    def calculate_hash_key(pieces, color):
+        """
+        calculates the zobrist hash key of a game state
+        :param pieces: list of all the active pieces on both boards
+        :param color: color of the player who makes the next move
+        :return: 64 bit integer identifying the state
+        """
+        hash_key = 0
+        for piece in pieces:
+            hash_key ^= ZobristKeys.piece_key(piece)
+        if color == PlayerColor.Black:
+            hash_key ^= ZobristKeys.black_to_move_key
+        return hash_key
+
+    @staticmethod
+    def calculate_pawn_key(pieces):
+        """
+        calculates the zobrist hash key of the pawns of a game state, which only changes
+        when a pawn moves, is captured or promotes
+        :param pieces: list of all the active pieces on both boards
+        :return: 64 bit integer identifying the placement of the pawns
+        """
+        pawn_key = 0
+        for piece in pieces:
+            if isinstance(piece, Pawn):
+                position = piece.position
+                pawn_key ^= ZobristKeys.piece_keys[(str(piece), position.board)][position.index]
+        return pawn_key
+
     def calculate_moves(self, arsenal):
         """
-        generates a list of all the moves possible for a player current this condition
+        generates a list of all the moves possible for a player current this condition.
+        The moves of a piece which the last move didn't affect are taken over from the
+        previous Board instead of being generated again.
         :param arsenal: list of pieces a player has
         :return: list of Moves that player can make
         """
+        previous_board = self.builder.previous_board
+        changed_indices = self.builder.changed_indices
         list_of_moves = []
         for piece in arsenal:
-            list_of_moves += piece.valid_moves(self)
+            moves = None
+            if previous_board is not None and \
+                    not any(piece.depends_on_tile(index) for index in changed_indices):
+                moves = previous_board.piece_moves.get(id(piece))
+            if moves is None:
+                moves = piece.valid_moves(self)
+            self.piece_moves[id(piece)] = moves
+            list_of_moves += moves
         return list_of_moves
 
+    def update_attack_map(self, previous_attack_map, previous_arsenal, arsenal):
+        """
+        counts the moves of a player ending on every tile from the counts of the previous
+        Board. Only the moves of the pieces whose moves calculate_moves didn't take over
+        are taken off and added again, so the map costs as much as the moves generated.
+        :param previous_attack_map: attack map of the player on the previous Board
+        :param previous_arsenal: list of pieces the player had on the previous Board
+        :param arsenal: list of pieces the player has
+        :return: dictionary of a list of counts per tile for each BoardIndex, as
+                 Player.calculate_attack_map returns
+        """
+        previous_piece_moves = self.builder.previous_board.piece_moves
+        attack_map = {BoardIndex.Board_One: previous_attack_map[BoardIndex.Board_One][:],
+                      BoardIndex.Board_Two: previous_attack_map[BoardIndex.Board_Two][:]}
+        for piece in previous_arsenal:
+            moves = previous_piece_moves[id(piece)]
+            if self.piece_moves.get(id(piece)) is not moves:
+                Player.count_moves(attack_map, moves, -1)
+        for piece in arsenal:
+            moves = self.piece_moves[id(piece)]
+            if previous_piece_moves.get(id(piece)) is not moves:
+                Player.count_moves(attack_map, moves, 1)
+        return attack_map
+
     def __repr__(self):
         """
         generates string representation of this game. suitable for printing and debugging
@@ -473,6 +850,8 @@ class BoardBuilder:
             self.board_config1[i] = None
             self.board_config2[i] = None
         self.next_move_maker = None
+        self.previous_board = None
+        self.changed_indices = ()
 
     def set_piece(self, piece):
         """
@@ -491,6 +870,16 @@ class BoardBuilder:
         """
         self.next_move_maker = next_move_maker
 
+    def set_previous_board(self, previous_board, changed_indices):
+        """
+        sets the Board this configuration was reached from by a move, so that the moves
+        of the pieces the move didn't affect can be taken over from it
+        :param previous_board: Board the move was made on
+        :param changed_indices: indexes of the tiles the move changed on either board
+        """
+        self.previous_board = previous_board
+        self.changed_indices = changed_indices
+
     def build(self):
         """
         Constucts the object of Board class which represents a suitable representation
@@ -520,6 +909,26 @@ class Piece:
     def move_piece(self, move):
         pass
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the moves have to be generated again
+        """
+        return True
+
+    def distance_to(self, index):
+        """
+        measures how far a tile is from this piece
+        :param index: index of the tile
+        :return: tuple of the number of rows and the number of columns between them
+        """
+        rows = abs(index // BoardProperties.NUM_TILES_PER_ROW -
+                   self.position.index // BoardProperties.NUM_TILES_PER_ROW)
+        columns = abs(index % BoardProperties.NUM_TILES_PER_ROW -
+                      self.position.index % BoardProperties.NUM_TILES_PER_ROW)
+        return rows, columns
+
     def __mul__(self, other):
         """
         overloads the multiplication operator
@@ -613,6 +1022,15 @@ class King(Piece):
         """
         return "K" if self.color == PlayerColor.White else "k"
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the tile is next to this piece
+        """
+        rows, columns = self.distance_to(index)
+        return max(rows, columns) == 1
+
     def move_piece(self, move):
         """
         creates a new instance of this Piece with updated Position
@@ -641,12 +1059,12 @@ class King(Piece):
                 tile_in_this_board = game_state.get_tile(position_in_same_board)
                 if not tile_in_next_board.is_occupied():
                     if not tile_in_this_board.is_occupied():
-                        moves.append(SimpleMove(game_state, self, destination))
+                        moves.append(SimpleMove(self, destination))
                     else:
                         piece_at_destination = tile_in_this_board.get_piece()
                         piece_color = piece_at_destination.color
                         if piece_color != self.color:
-                            moves.append(AttackMove(game_state, self, destination,
+                            moves.append(AttackMove(self, destination,
                                                     piece_at_destination))
         return moves
 
@@ -734,6 +1152,15 @@ class Queen(Piece):
         """
         return "Q" if self.color == PlayerColor.White else "q"
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the tile is on a row, column or diagonal of this piece
+        """
+        rows, columns = self.distance_to(index)
+        return rows == 0 or columns == 0 or rows == columns
+
     def move_piece(self, move):
         """
         creates a new instance of this Piece with updated Position
@@ -763,12 +1190,12 @@ class Queen(Piece):
                     tile_in_this_board = game_state.get_tile(position_in_same_board)
                     if not tile_in_next_board.is_occupied():
                         if not tile_in_this_board.is_occupied():
-                            moves.append(SimpleMove(game_state, self, destination))
+                            moves.append(SimpleMove(self, destination))
                         else:
                             piece_at_destination = tile_in_this_board.get_piece()
                             piece_color = piece_at_destination.color
                             if piece_color != self.color:
-                                moves.append(AttackMove(game_state, self, destination,
+                                moves.append(AttackMove(self, destination,
                                                         piece_at_destination))
                             break
         return moves
@@ -857,6 +1284,15 @@ class Bishop(Piece):
         """
         return "B" if self.color == PlayerColor.White else "b"
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the tile is on a diagonal of this piece
+        """
+        rows, columns = self.distance_to(index)
+        return rows == columns
+
     def move_piece(self, move):
         """
         creates a new instance of this Piece with updated Position
@@ -886,12 +1322,12 @@ class Bishop(Piece):
                     tile_in_this_board = game_state.get_tile(position_in_same_board)
                     if not tile_in_next_board.is_occupied():
                         if not tile_in_this_board.is_occupied():
-                            moves.append(SimpleMove(game_state, self, destination))
+                            moves.append(SimpleMove(self, destination))
                         else:
                             piece_at_destination = tile_in_this_board.get_piece()
                             piece_color = piece_at_destination.color
                             if piece_color != self.color:
-                                moves.append(AttackMove(game_state, self, destination,
+                                moves.append(AttackMove(self, destination,
                                                         piece_at_destination))
                             break
         return moves
@@ -978,6 +1414,15 @@ class Knight(Piece):
         """
         return "N" if self.color == PlayerColor.White else "n"
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the tile is a knight's jump away from this piece
+        """
+        rows, columns = self.distance_to(index)
+        return (rows, columns) in [(1, 2), (2, 1)]
+
     def move_piece(self, move):
         """
         creates a new instance of this Piece with updated Position
@@ -1008,12 +1453,12 @@ class Knight(Piece):
                 tile_in_this_board = game_state.get_tile(position_in_same_board)
                 if not tile_in_next_board.is_occupied():
                     if not tile_in_this_board.is_occupied():
-                        moves.append(SimpleMove(game_state, self, destination))
+                        moves.append(SimpleMove(self, destination))
                     else:
                         piece_at_destination = tile_in_this_board.get_piece()
                         piece_color = piece_at_destination.color
                         if piece_color != self.color:
-                            moves.append(AttackMove(game_state, self, destination,
+                            moves.append(AttackMove(self, destination,
                                                     piece_at_destination))
         return moves
 
@@ -1125,6 +1570,15 @@ class Rook(Piece):
         """
         return "R" if self.color == PlayerColor.White else "r"
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the tile is on the row or column of this piece
+        """
+        rows, columns = self.distance_to(index)
+        return rows == 0 or columns == 0
+
     def move_piece(self, move):
         """
         creates a new instance of this Piece with updated Position
@@ -1154,12 +1608,12 @@ class Rook(Piece):
                     tile_in_this_board = game_state.get_tile(position_in_same_board)
                     if not tile_in_next_board.is_occupied():
                         if not tile_in_this_board.is_occupied():
-                            moves.append(SimpleMove(game_state, self, destination))
+                            moves.append(SimpleMove(self, destination))
                         else:
                             piece_at_destination = tile_in_this_board.get_piece()
                             piece_color = piece_at_destination.color
                             if piece_color != self.color:
-                                moves.append(AttackMove(game_state, self, destination,
+                                moves.append(AttackMove(self, destination,
                                                         piece_at_destination))
                             break
         return moves
@@ -1253,6 +1707,15 @@ class Pawn(Piece):
         """
         return -1 if self.color == PlayerColor.White else 1
 
+    def depends_on_tile(self, index):
+        """
+        tells if the moves of this piece may change when a tile changes on either board
+        :param index: index of the tile
+        :return: True if the tile is one of the two in front of this piece or next to them
+        """
+        rows, columns = self.distance_to(index)
+        return 1 <= rows <= 2 and columns <= 1
+
     def move_piece(self, move):
         """
         creates a new instance of this Piece with updated Position
@@ -1278,15 +1741,15 @@ class Pawn(Piece):
                 flipped_pos = Position.flip_board(dest)
                 if offset == 8 and not game_state.get_tile(flipped_pos).is_occupied():
                     if PlayerColor.is_pawn_promotion_square(dest, self.color):
-                        moves.append(PawnPromotion(SimpleMove(game_state, self, dest)))
+                        moves.append(PawnPromotion(SimpleMove(self, dest)))
                     else:
-                        moves.append(SimpleMove(game_state, self, dest))
+                        moves.append(SimpleMove(self, dest))
                 elif offset == 16 and self.is_first_move and self.first_move_config():
                     next_pos = Position(BoardIndex.next_board(self.position.board),
                                         self.position.index + (self.get_direction() * 8))
                     if not (game_state.get_tile(next_pos).is_occupied() or
                             game_state.get_tile(flipped_pos).is_occupied()):
-                        moves.append(SimpleMove(game_state, self, dest))
+                        moves.append(SimpleMove(self, dest))
                 elif offset == 7 and not self.kill_on_left_exception():
                     tile = game_state.get_tile(flipped_pos)
                     if tile.is_occupied():
@@ -1294,10 +1757,10 @@ class Pawn(Piece):
                         piece_color = dest_piece.color
                         if piece_color != self.color:
                             if PlayerColor.is_pawn_promotion_square(dest, self.color):
-                                moves.append(PawnPromotion(AttackMove(game_state, self,
-                                                                      dest, dest_piece)))
+                                moves.append(PawnPromotion(AttackMove(self, dest,
+                                                                      dest_piece)))
                             else:
-                                moves.append(AttackMove(game_state, self, dest, dest_piece))
+                                moves.append(AttackMove(self, dest, dest_piece))
                 elif offset == 9 and not self.kill_on_right_exception():
                     tile = game_state.get_tile(flipped_pos)
                     if tile.is_occupied():
@@ -1305,10 +1768,10 @@ class Pawn(Piece):
                         piece_color = dest_piece.color
                         if piece_color != self.color:
                             if PlayerColor.is_pawn_promotion_square(dest, self.color):
-                                moves.append(PawnPromotion(AttackMove(game_state, self,
-                                                                      dest, dest_piece)))
+                                moves.append(PawnPromotion(AttackMove(self, dest,
+                                                                      dest_piece)))
                             else:
-                                moves.append(AttackMove(game_state, self, dest, dest_piece))
+                                moves.append(AttackMove(self, dest, dest_piece))
         return moves
 
     def first_move_config(self):
@@ -1357,14 +1820,14 @@ class Pawn(Piece):
 class Move:
     __doc__ = "Class to represent a move."
 
-    def __init__(self, board, piece, destination):
+    def __init__(self, piece, destination):
         """
-        Initialize the class with its properties passed in parameters
-        :param board: Board(can also be called Board state) on which this move occurs
+        Initialize the class with its properties passed in parameters. A move doesn't
+        keep the Board it was generated on, so it can be shared by every Board on which
+        its piece has the same moves.
         :param piece: Piece which participate in the move
         :param destination: destination Position at which the Piece tends to move
         """
-        self.board = board
         self.piece = piece
         self.destination = destination
 
@@ -1386,20 +1849,23 @@ class Move:
         """
         return self.destination == other.destination and self.piece == self.piece
 
-    def execute_move(self):
+    def execute_move(self, board):
         """
         Executes this move and generates a new representation of Board.
+        :param board: Board this move is made on
         :return: new/same(depends on condition) Board wrapped in MoveTransition class
                  instance
         """
         builder = BoardBuilder()
-        for piece in self.board.current_player.get_active_pieces():
+        for piece in board.current_player.get_active_pieces():
             if not self.piece == piece:
                 builder.set_piece(piece)
-        for piece in self.board.current_player.get_opponent().get_active_pieces():
+        for piece in board.current_player.get_opponent().get_active_pieces():
             builder.set_piece(piece)
         builder.set_piece(self.piece.move_piece(self))
-        builder.set_next_move_maker(self.board.current_player.get_color())
+        builder.set_next_move_maker(board.current_player.get_color())
+        builder.set_previous_board(board, (self.piece.position.index,
+                                           self.destination.index))
         return builder.build()
 
     def current_coordinate(self):
@@ -1409,18 +1875,25 @@ class Move:
         """
         return self.piece.position
 
+    def get_key(self):
+        """
+        gives a compact key of this move which identifies it among the moves of a state
+        :return: integer made of the board and index of the piece and the destination
+        """
+        return (int(self.piece.position.board) - 1) << 12 | \
+            self.piece.position.index << 6 | self.destination.index
+
 
 class SimpleMove(Move):
     __doc__ = "Represents a normal move made by a Piece"
 
-    def __init__(self, board, piece, destination):
+    def __init__(self, piece, destination):
         """
         initialises the class by calling __init__ of super class
-        :param board: Board on which move is made
         :param piece: Piece which tends to move
         :param destination: destination Position of this Move
         """
-        Move.__init__(self, board, piece, destination)
+        Move.__init__(self, piece, destination)
         self.value = self.piece.get_position_value(self.piece.position.index,
                                                    self.piece.color)
 
@@ -1458,15 +1931,14 @@ class SimpleMove(Move):
 class AttackMove(Move):
     __doc__ = "Represents an attack move made by a Piece"
 
-    def __init__(self, board, piece, destination, attacked_piece):
+    def __init__(self, piece, destination, attacked_piece):
         """
         initialises the class by calling __init__ of super class
-        :param board: Board on which move is made
         :param piece: Piece which tends to move
         :param destination: destination Position of this Move
         :param attacked_piece: Piece under attack
         """
-        Move.__init__(self, board, piece, destination)
+        Move.__init__(self, piece, destination)
         self.attacked_piece = attacked_piece
         self.value = self.piece.get_position_value(self.piece.position.index,
                                                    self.piece.color) + self.attacked_piece
@@ -1495,21 +1967,24 @@ class AttackMove(Move):
         """
         return self.value + other
 
-    def execute_move(self):
+    def execute_move(self, board):
         """
         Executes this move and generates a new representation of Board.
+        :param board: Board this move is made on
         :return: new/same(depends on condition) Board wrapped in MoveTransition class
                  instance
         """
         builder = BoardBuilder()
-        for piece in self.board.current_player.get_active_pieces():
+        for piece in board.current_player.get_active_pieces():
             if not self.piece == piece:
                 builder.set_piece(piece)
-        for piece in self.board.current_player.get_opponent().get_active_pieces():
+        for piece in board.current_player.get_opponent().get_active_pieces():
             if not piece == self.attacked_piece:
                 builder.set_piece(piece)
         builder.set_piece(self.piece.move_piece(self))
-        builder.set_next_move_maker(self.board.current_player.get_color())
+        builder.set_next_move_maker(board.current_player.get_color())
+        builder.set_previous_board(board, (self.piece.position.index,
+                                           self.destination.index))
         return builder.build()
 
     def is_attack(self):
@@ -1535,7 +2010,7 @@ class PawnPromotion(Move):
         Initialize the class with the move getting made and the Promoted Piece
         :param move: Move which causes PawnPromotion
         """
-        Move.__init__(self, move.board, move.piece, move.destination)
+        Move.__init__(self, move.piece, move.destination)
         self.move = move
         self.promotedPawn = move.piece
         self.value = 2 * move.value
@@ -1587,13 +2062,14 @@ class PawnPromotion(Move):
         """
         return self.move.attacked_piece()
 
-    def execute_move(self):
+    def execute_move(self, board):
         """
         Executes this move and generates a new representation of Board.
+        :param board: Board this move is made on
         :return: new/same(depends on condition) Board wrapped in MoveTransition class
                  instance
         """
-        board = self.move.execute_move()
+        board = self.move.execute_move(board)
         board_builder = BoardBuilder()
         for piece in board.current_player.get_active_pieces():
             if not self.promotedPawn == piece:
@@ -1602,6 +2078,7 @@ class PawnPromotion(Move):
             board_builder.set_piece(piece)
         board_builder.set_piece(self.promotedPawn.promotion_piece().move_piece(self))
         board_builder.next_move_maker = board.current_player.get_opponent().get_color()
+        board_builder.set_previous_board(board, (self.destination.index,))
         return board_builder.build()
 
 
@@ -1635,21 +2112,36 @@ class Player:
     __doc__ = "Represents a player in the game and encloses all the properties related " \
               "to it"
 
-    def __init__(self, board, legal_moves, opponent_moves):
+    def __init__(self, board, legal_moves, opponent_moves, attack_map=None):
         """
-        Initialises with board, moves and opponent moves
+        Initialises with board, moves and opponent moves. The Player only keeps a weak
+        reference to its Board, so that a Board and its Players are freed as soon as
+        the Board isn't used any more instead of waiting for the garbage collector.
+        get_board gives a strong reference to whoever has to keep the Board.
         :param board: Board on which this Player is playing
         :param legal_moves: list moves valid in this state, for this player
         :param opponent_moves: list moves valid in this state, for other player
+        :param attack_map: counts of the opponent's moves per tile as calculate_attack_map
+                           returns them, None to count them when first needed
         """
-        self.board = board
+        self.board = weakref.proxy(board)
+        self.board_reference = weakref.ref(board)
         self.player_king = self.establish_king()
         self.legal_moves = legal_moves
         self.opponents_moves = opponent_moves
+        self.attack_map = attack_map
 
     def establish_king(self):
         pass
 
+    def get_board(self):
+        """
+        gets the Board this Player is playing on as a strong reference, unlike the weak
+        proxy in board
+        :return: Board of this Player
+        """
+        return self.board_reference()
+
     def is_legal_move(self, move):
         """
         checks if the given move is legal
@@ -1672,6 +2164,50 @@ class Player:
                 attacking_moves.append(move)
         return attacking_moves
 
+    @staticmethod
+    def calculate_attack_map(opponents_moves):
+        """
+        counts the moves ending on every tile of both boards. A move is counted on the
+        board it is made on, not on the board its piece lands on.
+        :param opponents_moves: Moves this Player's opponent can make in current state
+        :return: dictionary of a list of counts per tile for each BoardIndex
+        """
+        attack_map = {BoardIndex.Board_One: [0] * BoardProperties.NUM_TILES,
+                      BoardIndex.Board_Two: [0] * BoardProperties.NUM_TILES}
+        Player.count_moves(attack_map, opponents_moves, 1)
+        return attack_map
+
+    @staticmethod
+    def count_moves(attack_map, moves, step):
+        """
+        adds moves to the counts of an attack map, or takes them off
+        :param attack_map: dictionary returned by calculate_attack_map
+        :param moves: list of Moves to count
+        :param step: 1 to add the moves, -1 to take them off
+        """
+        for move in moves:
+            destination = move.destination
+            attack_map[BoardIndex.next_board(destination.board)][destination.index] += step
+
+    def count_attacks_on_tile(self, position):
+        """
+        counts the attacks of the opponent on a given tile. The attack map comes from
+        the Board, or is built from the opponent's moves the first time it is needed.
+        :param position: Position of the tile
+        :return: number of the opponent's Moves on the given tile
+        """
+        return self.get_attack_map()[position.board][position.index]
+
+    def get_attack_map(self):
+        """
+        gets the counts of the opponent's moves on every tile, building them from the
+        opponent's moves if the Board didn't hand them over
+        :return: dictionary returned by calculate_attack_map
+        """
+        if self.attack_map is None:
+            self.attack_map = Player.calculate_attack_map(self.opponents_moves)
+        return self.attack_map
+
     def has_escape_moves(self):
         """
         Checks if there any moves to escape check
@@ -1702,8 +2238,7 @@ class Player:
         looks for a check on this Player's King
         :return: True there is a check else False
         """
-        return not len(self.calculate_attacks_on_tile(self.player_king.position,
-                                                      self.opponents_moves)) == 0
+        return self.count_attacks_on_tile(self.player_king.position) != 0
 
     def is_in_check_mate(self):
         """
@@ -1727,12 +2262,10 @@ class Player:
         """
         move_trans = self.make_move_without_changing_board(move)
         if move_trans.move_status == MoveStatus.DONE:
-            transition_board = move.execute_move()
-            king_attacks = Player.calculate_attacks_on_tile(
-                transition_board.current_player.get_opponent().player_king.position,
-                transition_board.current_player.legal_moves)
-            if len(king_attacks) != 0:
-                return MoveTransition(self.board, move, MoveStatus.LEAVES_KING_IN_CHECK)
+            transition_board = self.board.apply(move)
+            if transition_board.current_player.get_opponent().is_in_check():
+                return MoveTransition(self.get_board(), move,
+                                      MoveStatus.LEAVES_KING_IN_CHECK)
             return MoveTransition(transition_board, move, MoveStatus.DONE)
         else:
             return move_trans
@@ -1744,29 +2277,27 @@ class Player:
         :return: MoveTransition after making given Move
         """
         if not self.is_legal_move(move):
-            return MoveTransition(self.board, move, MoveStatus.ILLEGAL_MOVE)
-        new_move = deepcopy(move)
-        new_move.destination = new_move.destination.flip_board()
-        transition_board = new_move.execute_move()
-        king_attacks = Player.calculate_attacks_on_tile(
-                transition_board.current_player.get_opponent().player_king.position,
-                transition_board.current_player.legal_moves)
-        if len(king_attacks) != 0:
-            return MoveTransition(self.board, move, MoveStatus.LEAVES_KING_IN_CHECK)
+            return MoveTransition(self.get_board(), move, MoveStatus.ILLEGAL_MOVE)
+        new_move = copy(move)
+        new_move.destination = move.destination.flip_board()
+        transition_board = self.board.apply(new_move)
+        if transition_board.current_player.get_opponent().is_in_check():
+            return MoveTransition(self.get_board(), move, MoveStatus.LEAVES_KING_IN_CHECK)
         return MoveTransition(transition_board, move, MoveStatus.DONE)
 
 
 class WhitePlayer(Player):
     __doc__ = "represents WhitePlayer inherits from Player class"
 
-    def __init__(self, board, my_moves, other_moves):
+    def __init__(self, board, my_moves, other_moves, attack_map=None):
         """
         calls the __init__ of super class
         :param board: Board on which this player plays
         :param my_moves: moves for this Player
         :param other_moves: moves with Opponent
+        :param attack_map: counts of the Opponent's moves per tile, None to count later
         """
-        Player.__init__(self, board, my_moves, other_moves)
+        Player.__init__(self, board, my_moves, other_moves, attack_map)
 
     def establish_king(self):
         """
@@ -1805,14 +2336,15 @@ class WhitePlayer(Player):
 class BlackPlayer(Player):
     __doc__ = "represents BlackPlayer inherits from Player class"
 
-    def __init__(self, board, my_moves, other_moves):
+    def __init__(self, board, my_moves, other_moves, attack_map=None):
         """
         calls the __init__ of super class
         :param board: Board on which this player plays
         :param my_moves: moves for this Player
         :param other_moves: moves with Opponent
+        :param attack_map: counts of the Opponent's moves per tile, None to count later
         """
-        Player.__init__(self, board, my_moves, other_moves)
+        Player.__init__(self, board, my_moves, other_moves, attack_map)
 
     def establish_king(self):
         """
@@ -0,0 +1,248 @@
+"""Implements a memory benchmark of the search of the Alice Chess Engine"""
+import gc
+import sys
+import json
+import time
+import types
+import resource
+import argparse
+import threading
+from aliceengine import *
+import alicesearch
+from alicesearch import configure, analyse_lines, SearchLimits
+
+TRACKED_CLASSES = [("Position", Position), ("Tile", Tile), ("GameBoard", GameBoard),
+                   ("Move", Move), ("Board", Board), ("Player", Player)]
+
+
+class MemorySampler:
+    __doc__ = "Samples the resident memory of this process on a background thread while " \
+              "a search runs and keeps the highest sample. The thread only gets to run " \
+              "between bytecodes of the search, so short peaks may be missed."
+
+    def __init__(self, interval=0.005):
+        """
+        Initializes the sampler
+        :param interval: seconds between two samples
+        """
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        starts sampling on the background thread
+        """
+        self.peak = resident_memory()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.sample)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def sample(self):
+        """
+        samples the resident memory until stop is called
+        """
+        while not self.stop_event.wait(self.interval):
+            self.peak = max(self.peak, resident_memory())
+
+    def stop(self):
+        """
+        stops sampling
+        :return: highest resident memory sampled in kilobytes
+        """
+        self.stop_event.set()
+        self.thread.join()
+        self.peak = max(self.peak, resident_memory())
+        return self.peak
+
+
+def resident_memory():
+    """
+    reads the resident memory of this process from /proc, or the highest resident memory
+    so far where there is no /proc
+    :return: kilobytes of resident memory
+    """
+    try:
+        statm_file = open("/proc/self/statm")
+        pages = int(statm_file.read().split()[1])
+        statm_file.close()
+        return pages * resource.getpagesize() // 1024
+    except (IOError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def count_objects(objects=None):
+    """
+    counts the instances of the classes of the engine which make up the states
+    :param objects: list of objects to count, None for all the objects the garbage
+                    collector tracks
+    :return: dictionary of the number of instances per name in TRACKED_CLASSES and of all
+             the objects under "total"
+    """
+    if objects is None:
+        objects = gc.get_objects()
+    counts = dict((name, 0) for name, tracked_class in TRACKED_CLASSES)
+    counts["total"] = len(objects)
+    for instance in objects:
+        # weak proxies pretend to be instances of the class they point to
+        if type(instance) is not types.InstanceType:
+            continue
+        for name, tracked_class in TRACKED_CLASSES:
+            if isinstance(instance, tracked_class):
+                counts[name] += 1
+                break
+    return counts
+
+
+def difference(counts, base_counts):
+    """
+    subtracts two results of count_objects
+    :param counts: dictionary returned by count_objects
+    :param base_counts: dictionary returned by count_objects earlier
+    :return: dictionary of the differences per name
+    """
+    return dict((name, counts[name] - base_counts[name]) for name in counts)
+
+
+def measure(search, collect=True):
+    """
+    runs a search and measures the memory it takes
+    :param search: function running the search and returning a dictionary of its results
+    :param collect: False to turn the garbage collector off during the search, which
+                    shows how much memory the search leaves to it
+    :return: dictionary of the results of the search and of the resident memory before,
+             at the peak of and after the search in kilobytes, with the instances the
+             search left alive, those only the garbage collector freed and those it
+             retained after the collection
+    """
+    gc.collect()
+    base_counts = count_objects()
+    sampler = MemorySampler()
+    rss_before = resident_memory()
+    if not collect:
+        gc.disable()
+    sampler.start()
+    try:
+        record = search()
+    finally:
+        rss_peak = sampler.stop()
+        gc.enable()
+    left_counts = count_objects()
+    gc.set_debug(gc.DEBUG_SAVEALL)
+    gc.collect()
+    garbage_counts = count_objects(gc.garbage)
+    del gc.garbage[:]
+    gc.set_debug(0)
+    gc.collect()
+    record.update({"rss_before_kb": rss_before,
+                   "rss_peak_kb": rss_peak,
+                   "rss_after_kb": resident_memory(),
+                   "left": difference(left_counts, base_counts),
+                   "garbage": garbage_counts,
+                   "retained": difference(count_objects(), base_counts)})
+    return record
+
+
+def benchmark_depths(state, max_depth, collect=True):
+    """
+    searches a state to every depth up to a maximum with fresh tables
+    :param state: instance of Board to search
+    :param max_depth: deepest depth to search to
+    :param collect: False to turn the garbage collector off during the searches
+    :return: generator of a dictionary per depth, as returned by measure
+    """
+    for depth in range(1, max_depth + 1):
+        configure()
+        start_time = time.time()
+        record = measure(lambda: search_record(state, SearchLimits(depth)), collect)
+        record.update({"benchmark": "depth", "depth": depth,
+                       "seconds": round(time.time() - start_time, 4)})
+        yield record
+
+
+def benchmark_game(plies, depth, collect=True):
+    """
+    plays a game against itself from the standard board, searching every move to a
+    fixed depth, and measures the memory retained as the game goes on
+    :param plies: maximal number of plies of the game
+    :param depth: depth of the search of every move
+    :param collect: False to turn the garbage collector off during the searches
+    :return: generator of a dictionary per ply, as returned by measure, with the
+             instances and the resident memory retained since the start of the game
+    """
+    configure()
+    gc.collect()
+    game_counts = count_objects()
+    rss_start = resident_memory()
+    state = Board.create_standard_board()
+    for ply in range(1, plies + 1):
+        record = measure(lambda: search_record(state, SearchLimits(depth)), collect)
+        if record["move_key"] is None:
+            break
+        for move in state.current_player.legal_moves:
+            if move.get_key() == record["move_key"]:
+                transition = state.current_player.make_move(move)
+                if transition.move_status != MoveStatus.DONE:
+                    raise Exception("Value Error: " + str(record["move_key"]) +
+                                    " is not a legal move: " + transition.move_status +
+                                    ".")
+                state = transition.transition_board
+                break
+        gc.collect()
+        record.update({"benchmark": "game", "ply": ply,
+                       "game_retained": difference(count_objects(), game_counts),
+                       "game_rss_growth_kb": resident_memory() - rss_start})
+        yield record
+
+
+def search_record(state, limits):
+    """
+    searches a state like a move of a game does
+    :param state: instance of Board to search
+    :param limits: instance of SearchLimits of the search
+    :return: dictionary of the nodes searched and the best move with its key, which are
+             None if there is no legal move
+    """
+    lines = analyse_lines(state, limits)[0]
+    if len(lines) == 0:
+        return {"nodes": 0, "move": None, "move_key": None}
+    return {"nodes": alicesearch.nodes, "move": str(lines[0][0]),
+            "move_key": lines[0][0].get_key()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alice Chess engine memory benchmark")
+    parser.add_argument("--max-depth", type=int, default=3,
+                        help="deepest depth the position is searched to")
+    parser.add_argument("--position", metavar="NOTATION",
+                        help="position searched to every depth in the notation of "
+                             "Board.to_notation, defaults to the standard board")
+    parser.add_argument("--game-plies", type=int, default=40,
+                        help="number of plies of the game played against itself, 0 to "
+                             "skip the game")
+    parser.add_argument("--game-depth", type=int, default=1,
+                        help="depth every move of the game is searched to")
+    parser.add_argument("--no-gc", action="store_true",
+                        help="turn the garbage collector off during the searches")
+    parser.add_argument("--output", metavar="PATH", default="-",
+                        help="file the JSON lines are written to, - for stdout")
+    options = parser.parse_args()
+    output_file = sys.stdout if options.output == "-" else open(options.output, "w")
+    if options.position is not None:
+        start_state = Board.from_notation(options.position)
+    else:
+        start_state = Board.create_standard_board()
+    for depth_record in benchmark_depths(start_state, options.max_depth, not options.no_gc):
+        output_file.write(json.dumps(depth_record, sort_keys=True) + "\n")
+        output_file.flush()
+    for game_record in benchmark_game(options.game_plies, options.game_depth,
+                                      not options.no_gc):
+        output_file.write(json.dumps(game_record, sort_keys=True) + "\n")
+        output_file.flush()
+    output_file.write(json.dumps({"benchmark": "summary",
+                                  "max_rss_kb": resource.getrusage(
+                                      resource.RUSAGE_SELF).ru_maxrss},
+                                 sort_keys=True) + "\n")
+    output_file.close()
@@ -0,0 +1,95 @@
+"""Implements profiling of the moves chosen by the Alice Chess Engine"""
+import os
+import signal
+import cProfile
+
+
+class MoveProfiler:
+    __doc__ = "Profiles the search of a range of our moves. Every profiled move gets a " \
+              "pstats file written by cProfile and a file of collapsed stacks sampled " \
+              "from the profiling timer, which flamegraph.pl reads directly. Searches " \
+              "running in other processes or threads are not profiled."
+
+    def __init__(self, directory, first_move=1, last_move=None, sample_interval=0.001):
+        """
+        Initializes the profiler
+        :param directory: directory the profiles are written to
+        :param first_move: number of our first move to profile, counting from 1
+        :param last_move: number of our last move to profile, None for all the moves
+        :param sample_interval: seconds of cpu time between two stack samples
+        """
+        self.directory = directory
+        self.first_move = first_move
+        self.last_move = last_move
+        self.sample_interval = sample_interval
+        self.move_number = 0
+        self.profile = None
+        self.stacks = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def from_settings(directory, move_range):
+        """
+        creates a profiler from a command line option or an environment variable
+        :param directory: directory the profiles are written to, None disables profiling
+        :param move_range: string like 5-10, 5- or 7 selecting our moves to profile,
+                           None for all the moves
+        :return: an instance of MoveProfiler or None if profiling is disabled
+        """
+        if not directory:
+            return None
+        if not move_range:
+            return MoveProfiler(directory)
+        if "-" not in move_range:
+            return MoveProfiler(directory, int(move_range), int(move_range))
+        first_move, last_move = move_range.split("-", 1)
+        return MoveProfiler(directory, int(first_move or 1),
+                            int(last_move) if last_move else None)
+
+    def start(self):
+        """
+        starts profiling our next move if it is in the range of moves to profile
+        """
+        self.move_number += 1
+        if self.move_number < self.first_move or \
+                (self.last_move is not None and self.move_number > self.last_move):
+            return
+        self.stacks = {}
+        signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.sample_interval, self.sample_interval)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """
+        stops profiling the current move and writes its profiles
+        """
+        if self.profile is None:
+            return
+        self.profile.disable()
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        name = os.path.join(self.directory, "move-" + str(self.move_number))
+        self.profile.dump_stats(name + ".pstats")
+        self.profile = None
+        stacks_file = open(name + ".folded", "w")
+        for stack, count in sorted(self.stacks.items()):
+            stacks_file.write(stack + " " + str(count) + "\n")
+        stacks_file.close()
+
+    def sample(self, signal_number, frame):
+        """
+        records the stack of the interrupted frame. Called on every tick of the
+        profiling timer.
+        :param signal_number: number of the signal
+        :param frame: frame running when the signal arrived
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            names.append(module + ":" + code.co_name)
+            frame = frame.f_back
+        stack = ";".join(reversed(names))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
@@ -0,0 +1,60 @@
+"""Implements reading the referee protocol for the Alice Chess Engine"""
+import threading
+import Queue
+
+
+class ProtocolReader:
+    __doc__ = "Reads the messages of the referee on a background thread, so they arrive " \
+              "while we search. Messages are queued in the order they come in; the ones " \
+              "that end the game also set the interrupt event which stops the search."
+
+    def __init__(self, stream):
+        """
+        Initializes the reader
+        :param stream: file like object the referee writes to
+        """
+        self.stream = stream
+        self.messages = Queue.Queue()
+        self.interrupt = threading.Event()
+        self.thread = threading.Thread(target=self.read)
+        self.thread.daemon = True
+
+    def start(self):
+        """
+        starts reading on the background thread
+        """
+        self.thread.start()
+
+    def read(self):
+        """
+        queues every line of the stream until it ends. The end of the stream is queued
+        as None.
+        """
+        for line in iter(self.stream.readline, ""):
+            message = line.rstrip("\r\n")
+            self.messages.put(message)
+            if ProtocolReader.ends_game(message):
+                self.interrupt.set()
+        self.messages.put(None)
+        self.interrupt.set()
+
+    def get(self):
+        """
+        waits for the next message
+        :return: the next line sent by the referee or None once the stream has ended
+        """
+        while True:
+            try:
+                return self.messages.get(timeout=1.0)
+            except Queue.Empty:
+                pass
+
+    @staticmethod
+    def ends_game(message):
+        """
+        checks if a message ends the game, so that there is no point in searching on
+        :param message: a line sent by the referee
+        :return: True for results and draw offers else False
+        """
+        return "wins" in message or "loses" in message or "drawn" in message or \
+            " offers draw" in message
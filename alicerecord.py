@@ -0,0 +1,225 @@
+"""Implements game records for the Alice Chess Engine"""
+import os
+import mmap
+import struct
+from aliceengine import *
+
+
+class GameResult:
+    __doc__ = "A wrapper class for the results stored in a game record"
+    UNFINISHED = 0
+    WHITE_WINS = 1
+    BLACK_WINS = 2
+    DRAWN = 3
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def winner(color):
+        """
+        gives the result of a game won by a player
+        :param color: color of the winning player
+        :return: GameResult of the game
+        """
+        return GameResult.WHITE_WINS if color == PlayerColor.White else GameResult.BLACK_WINS
+
+
+class GameRecord:
+    __doc__ = "A game of an archive, read from the memory map of the archive. A game " \
+              "is a header followed by its moves, every move being the key of the move " \
+              "and, for annotated games, the score, depth and seconds of its search."
+    HEADER = struct.Struct(">IBBd")
+    MOVE = struct.Struct(">H")
+    ANNOTATED_MOVE = struct.Struct(">HfBf")
+    ANNOTATED = 1
+
+    def __init__(self, data, offset):
+        """
+        Reads the header of a game
+        :param data: memory map of the archive
+        :param offset: position of the game in the archive
+        """
+        self.data = data
+        self.offset = offset
+        self.move_count, self.flags, self.result, self.start_time = \
+            GameRecord.HEADER.unpack_from(data, offset)
+        if self.flags & GameRecord.ANNOTATED:
+            self.move_struct = GameRecord.ANNOTATED_MOVE
+        else:
+            self.move_struct = GameRecord.MOVE
+
+    def size(self):
+        """
+        :return: number of bytes the game takes in the archive
+        """
+        return GameRecord.HEADER.size + self.move_count * self.move_struct.size
+
+    def move(self, index):
+        """
+        reads a move of the game
+        :param index: non negative integer smaller than the number of moves
+        :return: tuple of the move key, the score, the depth and the seconds of the search
+                 of the move, the last three being None, 0 and 0.0 without annotations
+        """
+        values = self.move_struct.unpack_from(self.data, self.offset +
+                                              GameRecord.HEADER.size +
+                                              index * self.move_struct.size)
+        if len(values) == 1:
+            return values[0], None, 0, 0.0
+        move_key, score, depth, seconds = values
+        if score != score:
+            score = None
+        return move_key, score, depth, seconds
+
+    def moves(self):
+        """
+        iterates over the moves of the game
+        :return: generator of the tuples returned by move
+        """
+        for index in range(self.move_count):
+            yield self.move(index)
+
+    def replay(self):
+        """
+        plays the moves of the game from the standard board
+        :return: generator of the instances of Board after every move
+        """
+        state = Board.create_standard_board()
+        for move_key, score, depth, seconds in self.moves():
+            for move in state.current_player.legal_moves:
+                if move.get_key() == move_key:
+                    transition = state.current_player.make_move(move)
+                    if transition.move_status != MoveStatus.DONE:
+                        raise Exception("Value Error: " + str(move_key) + " is not a legal "
+                                        "move: " + transition.move_status + ".")
+                    state = transition.transition_board
+                    break
+            else:
+                raise Exception("Value Error: " + str(move_key) + " is not a legal move.")
+            yield state
+
+
+class GameRecordReader:
+    __doc__ = "Reads an archive of games through a memory map, so archives much larger " \
+              "than the memory can be iterated over."
+    MAGIC = "ALICEGR1"
+
+    def __init__(self, path):
+        """
+        Opens an archive written by GameRecordWriter
+        :param path: path of the archive
+        """
+        self.archive_file = open(path, "rb")
+        self.data = mmap.mmap(self.archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(GameRecordReader.MAGIC)] != GameRecordReader.MAGIC:
+            raise Exception("Value Error: " + path + " is not a game archive.")
+
+    def __iter__(self):
+        """
+        iterates over the complete games of the archive. A game cut short by a crash of
+        its writer ends the iteration.
+        :return: generator of instances of GameRecord
+        """
+        offset = len(GameRecordReader.MAGIC)
+        while offset + GameRecord.HEADER.size <= len(self.data):
+            game = GameRecord(self.data, offset)
+            if offset + game.size() > len(self.data):
+                break
+            yield game
+            offset += game.size()
+
+    def end(self):
+        """
+        :return: position right after the last complete game of the archive
+        """
+        offset = len(GameRecordReader.MAGIC)
+        for game in self:
+            offset = game.offset + game.size()
+        return offset
+
+    def close(self):
+        """
+        unmaps and closes the archive
+        """
+        self.data.close()
+        self.archive_file.close()
+
+
+class GameRecordWriter:
+    __doc__ = "Appends games to an archive while they are played. The move count in the " \
+              "header of a game is updated after every move is written, so the archive " \
+              "stays readable at any time. Only one writer may use an archive at a time."
+
+    def __init__(self, path):
+        """
+        Opens an archive for appending, creating it if necessary
+        :param path: path of the archive
+        """
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            reader = GameRecordReader(path)
+            end = reader.end()
+            reader.close()
+            self.archive_file = open(path, "r+b")
+            self.archive_file.truncate(end)
+        else:
+            self.archive_file = open(path, "w+b")
+            self.archive_file.write(GameRecordReader.MAGIC)
+        self.game_offset = None
+        self.move_count = 0
+        self.move_struct = None
+        self.flags = 0
+
+    def start_game(self, start_time, annotated=True):
+        """
+        starts a new game at the end of the archive
+        :param start_time: seconds since the epoch when the game started
+        :param annotated: True to store the score, depth and seconds of every move
+        """
+        self.archive_file.seek(0, os.SEEK_END)
+        self.game_offset = self.archive_file.tell()
+        self.move_count = 0
+        self.flags = GameRecord.ANNOTATED if annotated else 0
+        self.move_struct = GameRecord.ANNOTATED_MOVE if annotated else GameRecord.MOVE
+        self.archive_file.write(GameRecord.HEADER.pack(0, self.flags, GameResult.UNFINISHED,
+                                                       start_time))
+        self.archive_file.flush()
+
+    def add_move(self, move_key, score=None, depth=0, seconds=0.0):
+        """
+        appends a move to the current game
+        :param move_key: key of the move
+        :param score: score of the search which chose the move, None if there is none
+        :param depth: depth of the search which chose the move
+        :param seconds: time the search which chose the move took
+        """
+        if self.game_offset is None:
+            return
+        self.archive_file.seek(0, os.SEEK_END)
+        if self.flags & GameRecord.ANNOTATED:
+            self.archive_file.write(self.move_struct.pack(
+                move_key, float("nan") if score is None else score, min(depth, 255), seconds))
+        else:
+            self.archive_file.write(self.move_struct.pack(move_key))
+        self.move_count += 1
+        self.archive_file.seek(self.game_offset)
+        self.archive_file.write(struct.pack(">I", self.move_count))
+        self.archive_file.flush()
+
+    def finish_game(self, result):
+        """
+        stores the result of the current game
+        :param result: GameResult of the game
+        """
+        if self.game_offset is None:
+            return
+        self.archive_file.seek(self.game_offset + struct.calcsize(">IB"))
+        self.archive_file.write(struct.pack(">B", result))
+        self.archive_file.flush()
+        self.game_offset = None
+
+    def close(self):
+        """
+        closes the archive
+        """
+        self.archive_file.close()
@@ -0,0 +1,1290 @@
+"""Implements the search of the Alice Chess Engine"""
+import os
+import sys
+import json
+import time
+from aliceengine import *
+from alicetime import TimeManager
+from alicetables import TranspositionTable, SharedTranspositionTable, BoundType, \
+    EvaluationCache, PawnTable
+from alicebook import play_moves
+from alicetablebase import Tablebases, TablebaseValue
+from alicestats import SearchStatistics
+import multiprocessing
+import Queue
+import operator
+import collections
+import random
+
+print_msgs = False
+tablebase_win = 10000
+mate_score = 100000
+mate_bound = mate_score - 1000
+max_extended_ply = 32
+doubled_pawn_penalty = 10
+isolated_pawn_penalty = 10
+passed_pawn_bonus = 20
+mirror_blocked_pawn_penalty = 5
+mobility_weight = 0.1
+check_bonus = 50
+king_zone_attack_penalty = 2
+evaluation_term_names = ["mobility", "check", "pawns", "king"]
+my_team_color = None
+nodes = 0
+max_depth = 2
+search_function = "alphabeta"
+fixed_depth = None
+evaluation_terms = set(evaluation_term_names)
+king_zones = [[row * BoardProperties.NUM_TILES_PER_ROW + column
+               for row in range(max(index // BoardProperties.NUM_TILES_PER_ROW - 1, 0),
+                                min(index // BoardProperties.NUM_TILES_PER_ROW + 2,
+                                    BoardProperties.NUM_TILES_PER_ROW))
+               for column in range(max(index % BoardProperties.NUM_TILES_PER_ROW - 1, 0),
+                                   min(index % BoardProperties.NUM_TILES_PER_ROW + 2,
+                                       BoardProperties.NUM_TILES_PER_ROW))]
+              for index in range(BoardProperties.NUM_TILES)]
+timer = TimeManager(60.0)
+search_result = (0, None)
+held_result = None
+search_lines = []
+statistics = SearchStatistics()
+transposition_table = TranspositionTable()
+evaluation_cache = EvaluationCache()
+pawn_table = PawnTable()
+tablebases = None
+position_counts = {}
+smp_helpers = 0
+split_workers = 0
+split_stop_event = None
+worker_pool = None
+
+
+class SearchLimits:
+    __doc__ = "The limits of a search started by analyse. The search stops at the given " \
+              "depth or after the given seconds, whichever comes first, and keeps the " \
+              "scores of the given number of best root moves exact."
+
+    def __init__(self, depth=3, seconds=None, lines=1):
+        """
+        Initializes the limits
+        :param depth: depth of the last iteration, None to search until the time is up
+        :param seconds: time the search may take, None to search until the depth is reached
+        :param lines: number of best root moves to find with their principal variations
+        """
+        if depth is None and seconds is None:
+            raise Exception("Value Error: a search needs a depth or a time limit.")
+        if lines < 1:
+            raise Exception("Value Error: a search needs at least one line.")
+        self.depth = depth
+        self.seconds = seconds
+        self.lines = lines
+
+
+def get_current_and_opponent_players(state):
+    """
+    identifies which team color the program is playing as and the opponent
+    :param state: instance of Board representing a state of the game
+    :return: a list where 1st element is our team and 2nd element is the opponent
+    """
+    if my_team_color == PlayerColor.White:
+        return [state.white_player, state.black_player]
+    else:
+        return [state.black_player, state.white_player]
+
+
+def evaluate_state(my_player, other_player):
+    """
+    calculates and evaluates a score for the state
+    :param my_player: an instance of the Player class representing our team
+    :param other_player: an instance of the Player class representing the opponent
+    :return: an integer score that evaluates the state
+    """
+    evaluation = sum(my_player.get_active_pieces()) - sum(other_player.get_active_pieces())
+    if "mobility" in evaluation_terms:
+        my_mobility = sum(my_player.legal_moves)
+        other_mobility = sum(other_player.legal_moves)
+        evaluation += mobility_weight * (my_mobility - other_mobility)
+    if "check" in evaluation_terms:
+        if other_player.is_in_check():
+            evaluation += check_bonus
+        elif my_player.is_in_check():
+            evaluation -= check_bonus
+    if "pawns" in evaluation_terms:
+        pawn_score = evaluate_pawns(my_player.board)
+        if my_player.get_color() == PlayerColor.Black:
+            pawn_score = -pawn_score
+        evaluation += pawn_score
+    if "king" in evaluation_terms:
+        evaluation -= king_zone_attack_penalty * (count_king_zone_attacks(my_player) -
+                                                  count_king_zone_attacks(other_player))
+    return evaluation
+
+
+def count_king_zone_attacks(player):
+    """
+    counts the opponent's moves on the King of a player and on the tiles next to it, on
+    the board the King stands on, from the attack map the Board keeps up to date
+    :param player: an instance of the Player class
+    :return: number of the opponent's Moves on the King's zone
+    """
+    position = player.player_king.position
+    attacks = player.get_attack_map()[position.board]
+    return sum(attacks[index] for index in king_zones[position.index])
+
+
+def evaluate_pawns(state):
+    """
+    scores the pawn structure of a state through the pawn table
+    :param state: instance of Board representing a state of the game
+    :return: score of the pawn structure for white
+    """
+    if pawn_table is None:
+        return pawn_structure_score(state)
+    score = pawn_table.probe(state.pawn_key)
+    if statistics.enabled:
+        statistics.pawn_probes += 1
+        if score is not None:
+            statistics.pawn_hits += 1
+    if score is None:
+        score = pawn_structure_score(state)
+        pawn_table.store(state.pawn_key, score)
+    return score
+
+
+def pawn_structure_score(state):
+    """
+    calculates the pawn structure terms of a state. Pawns of both boards count for the
+    files they stand on, as every move takes a pawn to the other board. A pawn is
+    blocked on the mirror board when a pawn stands on the other board right in front of
+    it, since the square it moves to has to be empty there.
+    :param state: instance of Board representing a state of the game
+    :return: score of the pawn structure for white
+    """
+    pawns = [piece for piece in state.white_piece + state.black_piece
+             if isinstance(piece, Pawn)]
+    files = {PlayerColor.White: [0] * 8, PlayerColor.Black: [0] * 8}
+    tiles = set()
+    for pawn in pawns:
+        files[pawn.color][pawn.position.index % 8] += 1
+        tiles.add((pawn.position.board, pawn.position.index))
+    score = 0
+    for pawn in pawns:
+        column = pawn.position.index % 8
+        row = pawn.position.index // 8
+        own_files = files[pawn.color]
+        pawn_score = 0
+        if own_files[column] > 1:
+            pawn_score -= doubled_pawn_penalty
+        if (column == 0 or own_files[column - 1] == 0) and \
+                (column == 7 or own_files[column + 1] == 0):
+            pawn_score -= isolated_pawn_penalty
+        if pawn.color == PlayerColor.White:
+            forward = pawn.position.index - 8
+            passed = all(other.color == PlayerColor.White or
+                         abs(other.position.index % 8 - column) > 1 or
+                         other.position.index // 8 >= row for other in pawns)
+        else:
+            forward = pawn.position.index + 8
+            passed = all(other.color == PlayerColor.Black or
+                         abs(other.position.index % 8 - column) > 1 or
+                         other.position.index // 8 <= row for other in pawns)
+        if passed:
+            pawn_score += passed_pawn_bonus
+        if (BoardIndex.next_board(pawn.position.board), forward) in tiles:
+            pawn_score -= mirror_blocked_pawn_penalty
+        score += pawn_score if pawn.color == PlayerColor.White else -pawn_score
+    return score
+
+
+def cached_evaluation(state, my_player, other_player):
+    """
+    evaluates a state through the evaluation cache
+    :param state: instance of Board representing a state of the game
+    :param my_player: an instance of the Player class representing our team
+    :param other_player: an instance of the Player class representing the opponent
+    :return: an integer score that evaluates the state
+    """
+    if evaluation_cache is None:
+        return evaluate_state(my_player, other_player)
+    score = evaluation_cache.probe(state.hash_key, my_team_color)
+    if statistics.enabled:
+        statistics.evaluation_probes += 1
+        if score is not None:
+            statistics.evaluation_hits += 1
+    if score is None:
+        score = evaluate_state(my_player, other_player)
+        evaluation_cache.store(state.hash_key, my_team_color, score)
+    return score
+
+
+"""#######################################################################################
+################################## Alpha-Beta Pruning ####################################
+#######################################################################################"""
+
+
+def alpha_beta_pruning(state, emit=True):
+    """
+    implements alpha-beta pruning algorithm on the given state, or mini-max when the
+    search function is configured so
+    :param state: instance of Board representing a state of the game
+    :param emit: False to hold the statistics and the result of the search back until
+                 emit_held_result is called, as a ponder search does
+    :return: an instance of Move
+    """
+    global my_team_color
+    my_team_color = state.current_player.get_color()
+    if search_function == "minimax":
+        return min_max(state, emit)
+    root_moves = generate_root_moves(state)
+    if len(root_moves) == 0:
+        return state.current_player.legal_moves[0]
+    if len(root_moves) == 1:
+        return root_moves[0][0]
+    move = tablebase_move(state, root_moves)
+    if move is not None:
+        return move
+    if smp_helpers > 0:
+        return lazy_smp_search(root_moves, emit)
+    return iterative_deepening(root_moves, depth_limit=fixed_depth, emit=emit)[0]
+
+
+def generate_root_moves(state):
+    """
+    makes all the moves of the given state, best looking moves first
+    :param state: instance of Board representing a state of the game
+    :return: list of tuples of a doable Move and the Board it leads to
+    """
+    legal_moves = state.current_player.legal_moves
+    legal_moves.sort(key=operator.attrgetter('value'), reverse=True)
+    root_moves = []
+    for move in legal_moves:
+        next_state = state.current_player.make_move(move)
+        if next_state.move_status == MoveStatus.DONE:
+            root_moves.append((move, next_state.transition_board))
+    return root_moves
+
+
+def iterative_deepening(root_moves, current_depth=1, report=None, depth_limit=None,
+                        lines=1, emit=True):
+    """
+    searches the root moves one ply deeper on every iteration until the time manager
+    stops the search
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :param current_depth: depth of the first iteration
+    :param report: function called with the depth, best Move and score of every
+                   completed iteration
+    :param depth_limit: depth of the last iteration, None to search until the time
+                        manager stops the search
+    :param lines: number of best root moves whose scores are kept exact, they are left
+                  in search_lines
+    :param emit: False to keep the statistics and the result in held_result instead of
+                 emitting them and setting search_result
+    :return: tuple of the best Move, the depth of the last completed iteration and its
+             score
+    """
+    global nodes, search_lines
+    best_move = root_moves[0][0]
+    best_score = float("-inf")
+    ranking = [(best_move, best_score)]
+    completed_depth = 0
+    nodes = 0
+    statistics.start()
+    while True:
+        start_time = time.time()
+        if lines > 1:
+            iteration_ranking, searched_moves = multi_pv_root(root_moves, current_depth,
+                                                              lines)
+            if not timer.stopped:
+                ranking = iteration_ranking
+                best_move, best_score = ranking[0]
+        else:
+            if worker_pool is not None:
+                iteration_best_move, possible_score, searched_moves = \
+                    split_search_root(root_moves, current_depth)
+            else:
+                iteration_best_move, possible_score, searched_moves = \
+                    search_root(root_moves, current_depth)
+            if searched_moves > 0:
+                best_move = iteration_best_move
+                best_score = possible_score
+                ranking = [(best_move, best_score)]
+        iteration_time = time.time() - start_time
+        if statistics.enabled:
+            statistics.finish_iteration(current_depth, nodes, iteration_time,
+                                        not timer.stopped)
+        if timer.stopped:
+            break
+        completed_depth = current_depth
+        if report is not None:
+            report(completed_depth, best_move, best_score)
+        if depth_limit is not None and completed_depth >= depth_limit:
+            break
+        if best_score >= mate_bound and mate_score - best_score <= completed_depth + 1:
+            break
+        if not timer.next_iteration(best_move, iteration_time):
+            break
+        if lines > 1:
+            rank = dict((id(move), index) for index, (move, score) in enumerate(ranking))
+            root_moves.sort(key=lambda root_move: rank.get(id(root_move[0]), len(rank)))
+        else:
+            root_moves.sort(key=lambda root_move: root_move[0] is not best_move)
+        current_depth += 1
+    if report is None:
+        finish_search(best_move, completed_depth, best_score, emit)
+    search_lines = ranking[:lines]
+    return best_move, completed_depth, best_score
+
+
+def finish_search(best_move, depth, score, emit):
+    """
+    emits the statistics of a finished search and makes its depth and score the
+    search_result, or holds them back in held_result
+    :param best_move: the best Move found
+    :param depth: depth of the last completed iteration
+    :param score: score of the best move
+    :param emit: False to hold the statistics and the result back
+    """
+    global search_result, held_result
+    if emit:
+        statistics.emit(nodes, best_move, depth, score)
+        search_result = (depth, score)
+    else:
+        held_result = (nodes, best_move, depth, score)
+
+
+def emit_held_result():
+    """
+    emits the statistics of the last search started with emit set to False, like a
+    ponder search whose guess came true, and makes its depth and score the search_result
+    """
+    global search_result, held_result
+    if held_result is None:
+        return
+    searched_nodes, best_move, depth, score = held_result
+    held_result = None
+    statistics.emit(searched_nodes, best_move, depth, score)
+    search_result = (depth, score)
+
+
+def search_root(root_moves, depth):
+    """
+    searches every root move to the given depth
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :param depth: an integer value representing how deep into the search tree apb goes
+    :return: tuple of the best Move, its score and the number of root moves searched
+             before the time manager stopped the search
+    """
+    alpha = float("-inf")
+    beta = float("inf")
+    possible_score = float("-inf")
+    best_move = root_moves[0][0]
+    searched_moves = 0
+    for move, next_board in root_moves:
+        if print_msgs:
+            print "Trying ", str(move)
+        remember_position(next_board)
+        score = alpha_beta_min(next_board, alpha, beta, depth, 1)
+        forget_position(next_board)
+        if timer.stopped:
+            break
+        searched_moves += 1
+        if possible_score < score:
+            possible_score = score
+            best_move = move
+        alpha = max(alpha, possible_score)
+    return best_move, possible_score, searched_moves
+
+
+def multi_pv_root(root_moves, depth, lines):
+    """
+    searches every root move to the given depth keeping the scores of the best lines
+    exact. Every move is searched with the score of the line ranked last as its alpha
+    bound, so a move which can't make it into the best lines is cut off as in a normal
+    search and only its upper bound is known.
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :param depth: an integer value representing how deep into the search tree apb goes
+    :param lines: number of best root moves whose scores have to be exact
+    :return: tuple of the list of tuples of the searched Moves and their scores, best
+             first, and the number of root moves searched before the time manager
+             stopped the search
+    """
+    ranking = []
+    searched_moves = 0
+    for move, next_board in root_moves:
+        if print_msgs:
+            print "Trying ", str(move)
+        alpha = float("-inf")
+        if len(ranking) >= lines:
+            alpha = ranking[lines - 1][1]
+        remember_position(next_board)
+        score = alpha_beta_min(next_board, alpha, float("inf"), depth, 1)
+        forget_position(next_board)
+        if timer.stopped:
+            break
+        searched_moves += 1
+        ranking.append((move, score))
+        ranking.sort(key=lambda line: line[1], reverse=True)
+    return ranking, searched_moves
+
+
+def split_search_root(root_moves, depth):
+    """
+    searches the root moves to the given depth on the worker pool, one root move per
+    task. Every task gets the best score known when it is handed out as its alpha bound.
+    Equal scores are decided by the order of the root moves, so the result doesn't
+    depend on which worker finishes first.
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :param depth: an integer value representing how deep into the search tree apb goes
+    :return: tuple of the best Move, its score and the number of root moves searched
+             before the time manager stopped the search
+    """
+    global nodes
+    split_stop_event.clear()
+    finished = Queue.Queue()
+    scores = [None] * len(root_moves)
+    alpha = float("-inf")
+    next_index = 0
+    pending = 0
+    while next_index < len(root_moves) or pending > 0:
+        while pending < split_workers and next_index < len(root_moves) and \
+                not timer.stopped:
+            task = (next_index, root_moves[next_index][1], alpha, depth, my_team_color,
+                    position_counts)
+            worker_pool.apply_async(split_worker, (task,), callback=finished.put)
+            next_index += 1
+            pending += 1
+        if pending == 0:
+            break
+        try:
+            index, score, worker_nodes, stopped = finished.get(timeout=0.01)
+        except Queue.Empty:
+            if timer.should_stop(0):
+                split_stop_event.set()
+            continue
+        pending -= 1
+        nodes += worker_nodes
+        if stopped:
+            timer.stop()
+            split_stop_event.set()
+            continue
+        scores[index] = score
+        alpha = max(alpha, score)
+    best_move = root_moves[0][0]
+    possible_score = float("-inf")
+    for index in range(len(root_moves)):
+        if scores[index] is not None and possible_score < scores[index]:
+            possible_score = scores[index]
+            best_move = root_moves[index][0]
+    if scores[0] is None:
+        return best_move, possible_score, 0
+    return best_move, possible_score, len(scores) - scores.count(None)
+
+
+def split_worker(task):
+    """
+    searches a single root move in a worker process of the pool. The transposition table
+    is cleared first so that results don't depend on the tasks the worker ran before.
+    :param task: tuple of the task index, the state after the root move, which is
+                 pickled as its binary encoding, the alpha bound, the depth, the color
+                 we play and the counts of the positions of the game
+    :return: tuple of the task index, the score, the number of nodes searched and True
+             if the search was stopped
+    """
+    global my_team_color, nodes, position_counts
+    index, state, alpha, depth, my_team_color, position_counts = task
+    nodes = 0
+    transposition_table.clear()
+    timer.start_infinite(split_stop_event)
+    remember_position(state)
+    score = alpha_beta_min(state, alpha, float("inf"), depth, 1)
+    return index, score, nodes, timer.stopped
+
+
+def init_split_worker(stop_event):
+    """
+    prepares a freshly started worker process of the pool
+    :param stop_event: multiprocessing.Event set when the search has to stop
+    """
+    global split_stop_event, transposition_table
+    split_stop_event = stop_event
+    transposition_table = TranspositionTable()
+
+
+def benchmark_root_split(depth):
+    """
+    searches the standard board to a fixed depth serially and on the worker pool and
+    writes the times and the speedup
+    :param depth: an integer value representing how deep into the search tree apb goes
+    """
+    global my_team_color, worker_pool
+    state = Board.create_standard_board()
+    my_team_color = state.current_player.get_color()
+    root_moves = generate_root_moves(state)
+    pool = worker_pool
+    worker_pool = None
+    transposition_table.clear()
+    timer.start_infinite(None)
+    start_time = time.time()
+    serial_move = search_root(root_moves, depth)[0]
+    serial_time = time.time() - start_time
+    worker_pool = pool
+    timer.start_infinite(None)
+    start_time = time.time()
+    split_move = split_search_root(root_moves, depth)[0]
+    split_time = time.time() - start_time
+    sys.stdout.write("depth " + str(depth) + ": serial " + str(serial_time) + "s " +
+                     str(serial_move) + ", " + str(split_workers) + " workers " +
+                     str(split_time) + "s " + str(split_move) + ", speedup " +
+                     str(serial_time / split_time) + "\n")
+
+
+def lazy_smp_search(root_moves, emit=True):
+    """
+    searches the root moves in this process and in helper processes at the same time.
+    All of them share the transposition table. Every other helper starts one ply deeper
+    and every helper tries the root moves in its own order, so that they fill the table
+    with different parts of the tree. The statistics and the result report the deepest
+    completed iteration, which may be a helper's.
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :param emit: False to hold the statistics and the result of the search back
+    :return: an instance of Move found by the deepest completed iteration
+    """
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Array('d', 3 * smp_helpers)
+    helpers = []
+    sys.stdout.flush()
+    for helper_id in range(smp_helpers):
+        helper = multiprocessing.Process(target=lazy_smp_helper,
+                                         args=(root_moves, helper_id, stop_event, results))
+        helper.daemon = True
+        helper.start()
+        helpers.append(helper)
+    best_move, depth, score = iterative_deepening(root_moves, depth_limit=fixed_depth,
+                                                  emit=False)
+    stop_event.set()
+    for helper in helpers:
+        helper.join()
+    for helper_id in range(smp_helpers):
+        helper_depth, move_key, helper_score = results[3 * helper_id:3 * helper_id + 3]
+        if helper_depth > depth:
+            for move, next_board in root_moves:
+                if move.get_key() == move_key:
+                    best_move, depth, score = move, int(helper_depth), helper_score
+    finish_search(best_move, depth, score, emit)
+    return best_move
+
+
+def lazy_smp_helper(root_moves, helper_id, stop_event, results):
+    """
+    searches in a helper process of lazy_smp_search until the main process sets the
+    stop event
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :param helper_id: number of this helper
+    :param stop_event: multiprocessing.Event set once the main process is done
+    :param results: shared array receiving depth, move key and score of the deepest
+                    iteration completed by every helper
+    """
+    def report(depth, move, score):
+        with results.get_lock():
+            results[3 * helper_id:3 * helper_id + 3] = [depth, move.get_key(), score]
+
+    later_moves = root_moves[1:]
+    random.Random(helper_id).shuffle(later_moves)
+    timer.start_infinite(stop_event)
+    iterative_deepening(root_moves[:1] + later_moves, 1 + helper_id % 2, report)
+
+
+def alpha_beta_min(state, alpha, beta, depth, ply=1):
+    """
+    minimizer node analyzing the opponents moves
+    :param state: instance of Board representing a state of the game
+    :param alpha: an integer value representing the lower bound for apb
+    :param beta: an integer value representing the upper bound for apb
+    :param depth: an integer value representing how deep into the search tree apb goes
+    :param ply: an integer value representing the number of moves made since the root
+    :return: an integer value that chooses the minimum from the child nodes
+    """
+    global nodes
+    nodes += 1
+    if timer.should_stop(nodes):
+        return 0
+    if position_counts.get(state.hash_key, 0) > 1:
+        return 0
+    if tablebases is not None:
+        score = tablebase_score(state)
+        if score is not None:
+            return score
+    alpha = max(alpha, ply + 1 - mate_score)
+    beta = min(beta, mate_score - ply)
+    if alpha >= beta:
+        return alpha
+    my_player, other_player = get_current_and_opponent_players(state)
+    if depth == 0:
+        score = cached_evaluation(state, my_player, other_player)
+        if print_msgs:
+            print "\t"*depth, "(MIN)Returned = ", score
+        if statistics.enabled:
+            statistics.leaves += 1
+        return score
+    entry = transposition_table.probe(state.hash_key)
+    table_move_key = None
+    if statistics.enabled:
+        statistics.table_probes += 1
+    if entry is not None:
+        if statistics.enabled:
+            statistics.table_hits += 1
+        entry_depth, entry_score, entry_bound, table_move_key = entry
+        entry_score = score_from_table(entry_score, ply)
+        if entry_depth >= depth and (entry_bound == BoundType.EXACT or
+                                     (entry_bound == BoundType.LOWER and entry_score >= beta) or
+                                     (entry_bound == BoundType.UPPER and entry_score <= alpha)):
+            if statistics.enabled:
+                statistics.table_cutoffs += 1
+            return entry_score
+    original_beta = beta
+    legal_moves = state.current_player.legal_moves
+    val = float("inf")
+    best_move_key = None
+    searched_moves = 0
+    legal_moves.sort(key=operator.attrgetter('value'), reverse=True)
+    if table_move_key is not None:
+        legal_moves.sort(key=lambda legal_move: legal_move.get_key() != table_move_key)
+    for move in legal_moves:
+        next_state = state.current_player.make_move(move)
+        if next_state.move_status == MoveStatus.DONE:
+            if print_msgs:
+                print "\t" * depth, depth, ": Trying ", str(move)
+            # analyse_state(next_state.transition_board)
+            remember_position(next_state.transition_board)
+            score = alpha_beta_max(next_state.transition_board, alpha, beta,
+                                   depth - 1 + check_extension(next_state.transition_board,
+                                                               ply),
+                                   ply + 1)
+            forget_position(next_state.transition_board)
+            searched_moves += 1
+            if timer.stopped:
+                return min(val, score)
+            if score < val or best_move_key is None:
+                val = min(val, score)
+                best_move_key = move.get_key()
+
+            if val < alpha:
+                if print_msgs:
+                    print depth, " : PRUNED!"
+                if statistics.enabled:
+                    statistics.cutoff(searched_moves)
+                break
+            beta = min(beta, val)
+    if best_move_key is None:
+        return mate_score - ply if state.current_player.is_in_check() else 0
+    if val <= alpha:
+        bound = BoundType.UPPER
+    elif val >= original_beta:
+        bound = BoundType.LOWER
+    else:
+        bound = BoundType.EXACT
+    transposition_table.store(state.hash_key, depth, score_to_table(val, ply), bound,
+                              best_move_key)
+    return val
+
+
+def alpha_beta_max(state, alpha, beta, depth=1, ply=2):
+    """
+    maximizer node analyzing our teams' moves
+    :param state: instance of Board representing a state of the game
+    :param alpha: an integer value representing the lower bound for apb
+    :param beta: an integer value representing the upper bound for apb
+    :param depth: an integer value representing how deep into the search tree apb goes
+    :param ply: an integer value representing the number of moves made since the root
+    :return: an integer value that chooses the maximum from the child nodes
+    """
+    global nodes
+    nodes += 1
+    if timer.should_stop(nodes):
+        return 0
+    if position_counts.get(state.hash_key, 0) > 1:
+        return 0
+    if tablebases is not None:
+        score = tablebase_score(state)
+        if score is not None:
+            return score
+    alpha = max(alpha, ply - mate_score)
+    beta = min(beta, mate_score - ply - 1)
+    if alpha >= beta:
+        return beta
+    my_player, other_player = get_current_and_opponent_players(state)
+    if depth == 0:
+        score = cached_evaluation(state, my_player, other_player)
+        if print_msgs:
+            print "\t" * depth, "(MAX)Returned = ", score
+        if statistics.enabled:
+            statistics.leaves += 1
+        return score
+    entry = transposition_table.probe(state.hash_key)
+    table_move_key = None
+    if statistics.enabled:
+        statistics.table_probes += 1
+    if entry is not None:
+        if statistics.enabled:
+            statistics.table_hits += 1
+        entry_depth, entry_score, entry_bound, table_move_key = entry
+        entry_score = score_from_table(entry_score, ply)
+        if entry_depth >= depth and (entry_bound == BoundType.EXACT or
+                                     (entry_bound == BoundType.LOWER and entry_score >= beta) or
+                                     (entry_bound == BoundType.UPPER and entry_score <= alpha)):
+            if statistics.enabled:
+                statistics.table_cutoffs += 1
+            return entry_score
+    original_alpha = alpha
+    legal_moves = state.current_player.legal_moves
+    val = float("-inf")
+    best_move_key = None
+    searched_moves = 0
+    legal_moves.sort(key=operator.attrgetter('value'), reverse=True)
+    if table_move_key is not None:
+        legal_moves.sort(key=lambda legal_move: legal_move.get_key() != table_move_key)
+    for move in legal_moves:
+        next_state = state.current_player.make_move(move)
+        if next_state.move_status == MoveStatus.DONE:
+            if print_msgs:
+                print "\t" * depth, depth, ": Trying ", str(move)
+            # analyse_state(next_state.transition_board)
+            remember_position(next_state.transition_board)
+            score = alpha_beta_min(next_state.transition_board, alpha, beta,
+                                   depth - 1 + check_extension(next_state.transition_board,
+                                                               ply),
+                                   ply + 1)
+            forget_position(next_state.transition_board)
+            searched_moves += 1
+            if timer.stopped:
+                return max(val, score)
+            if score > val or best_move_key is None:
+                val = max(val, score)
+                best_move_key = move.get_key()
+
+            if val > beta:
+                if print_msgs:
+                    print depth, " : PRUNED!"
+                if statistics.enabled:
+                    statistics.cutoff(searched_moves)
+                break
+            alpha = max(alpha, val)
+    if best_move_key is None:
+        return ply - mate_score if state.current_player.is_in_check() else 0
+    if val <= original_alpha:
+        bound = BoundType.UPPER
+    elif val >= beta:
+        bound = BoundType.LOWER
+    else:
+        bound = BoundType.EXACT
+    transposition_table.store(state.hash_key, depth, score_to_table(val, ply), bound,
+                              best_move_key)
+    return val
+
+
+def check_extension(state, ply):
+    """
+    extends the search by a ply after a move giving check, as long as the line isn't
+    already too long
+    :param state: instance of Board representing the state after the move
+    :param ply: an integer value representing the number of moves made since the root
+    :return: 1 to extend the search else 0
+    """
+    if ply < max_extended_ply and state.current_player.is_in_check():
+        return 1
+    return 0
+
+
+def score_to_table(score, ply):
+    """
+    converts a mate score counted from the root into a mate score counted from the
+    state, as transpositions may reach the state at another ply
+    :param score: a score of the search
+    :param ply: an integer value representing the number of moves made since the root
+    :return: the score to store in the transposition table
+    """
+    if score >= mate_bound:
+        return score + ply
+    if score <= -mate_bound:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """
+    converts a mate score read from the transposition table back into a mate score
+    counted from the root
+    :param score: a score stored by score_to_table
+    :param ply: an integer value representing the number of moves made since the root
+    :return: the score for the search
+    """
+    if score >= mate_bound:
+        return score - ply
+    if score <= -mate_bound:
+        return score + ply
+    return score
+
+
+def mate_moves(score):
+    """
+    turns a mate score into the number of our moves until the mate
+    :param score: a score of the search
+    :return: positive number of moves until we mate, negative number of moves until we
+             are mated, None if the score isn't a mate score
+    """
+    if score >= mate_bound:
+        return (mate_score - score + 1) // 2
+    if score <= -mate_bound:
+        return -((mate_score + score + 1) // 2)
+    return None
+
+
+def remember_position(state):
+    """
+    counts a state of the game or of the line being searched, so that reaching it again
+    is scored as a draw by repetition
+    :param state: instance of Board representing a state of the game
+    """
+    position_counts[state.hash_key] = position_counts.get(state.hash_key, 0) + 1
+
+
+def forget_position(state):
+    """
+    takes back the count of a state once the search leaves it
+    :param state: instance of Board counted by remember_position
+    """
+    count = position_counts[state.hash_key] - 1
+    if count == 0:
+        del position_counts[state.hash_key]
+    else:
+        position_counts[state.hash_key] = count
+
+
+def tablebase_score(state):
+    """
+    looks up the score of a state in the tablebases. A won state scores more than any
+    evaluation, the quicker the mate the higher the score.
+    :param state: instance of Board representing a state of the game
+    :return: the score of the state for our team or None if it isn't in the tablebases
+    """
+    value = tablebases.probe(state)
+    if value is None or value == TablebaseValue.INVALID:
+        return None
+    if value == TablebaseValue.DRAW:
+        return 0
+    score = tablebase_win - TablebaseValue.plies_to_mate(value)
+    if TablebaseValue.is_loss(value):
+        score = -score
+    if state.current_player.get_color() != my_team_color:
+        score = -score
+    return score
+
+
+def tablebase_move(state, root_moves):
+    """
+    picks the move keeping the best tablebase result: the quickest mate, else a draw,
+    else the longest resistance
+    :param state: instance of Board representing a state of the game
+    :param root_moves: list of tuples of a Move and the Board it leads to
+    :return: an instance of Move or None if the state isn't in the tablebases
+    """
+    if tablebases is None or tablebases.probe(state) is None:
+        return None
+    best_move = None
+    best_rank = None
+    for move, next_board in root_moves:
+        value = tablebases.probe(next_board)
+        if value is None or value == TablebaseValue.INVALID:
+            return None
+        if TablebaseValue.is_loss(value):
+            rank = (2, -value)
+        elif TablebaseValue.is_win(value):
+            rank = (0, value)
+        else:
+            rank = (1, 0)
+        if best_rank is None or rank > best_rank:
+            best_move = move
+            best_rank = rank
+    return best_move
+
+
+def transposition_move(state):
+    """
+    looks up the best move stored in the transposition table for a state
+    :param state: instance of Board representing a state of the game
+    :return: an instance of Move which can be made in the state or None
+    """
+    entry = transposition_table.probe(state.hash_key)
+    if entry is None or entry[3] is None:
+        return None
+    for move in state.current_player.legal_moves:
+        if move.get_key() == entry[3]:
+            if state.current_player.make_move(move).move_status == MoveStatus.DONE:
+                return move
+    return None
+
+
+"""#######################################################################################
+########################################## MIN-MAX #######################################
+#######################################################################################"""
+
+
+def min_max(state, emit=True):
+    """
+    implements mini-max algorithm on the given state. Like iterative_deepening, it
+    searches one ply deeper on every iteration, up to the fixed depth if one is
+    configured, until the time manager stops the search.
+    :param state: instance of Board representing a state of the game
+    :param emit: False to hold the statistics and the result of the search back until
+                 emit_held_result is called
+    :return: an instance of Move
+    """
+    global max_depth, nodes
+    root_moves = generate_root_moves(state)
+    if len(root_moves) == 0:
+        return state.current_player.legal_moves[0]
+    best_move = root_moves[0][0]
+    best_score = float("-inf")
+    completed_depth = 0
+    current_depth = 1
+    nodes = 0
+    statistics.start()
+    while True:
+        start_time = time.time()
+        max_depth = current_depth + 1
+        iteration_best_move = None
+        iteration_score = float("-inf")
+        for move, next_board in root_moves:
+            score = minimizer(next_board)
+            if timer.stopped:
+                break
+            if iteration_best_move is None or score > iteration_score:
+                iteration_best_move = move
+                iteration_score = score
+        if iteration_best_move is not None:
+            best_move = iteration_best_move
+            best_score = iteration_score
+        iteration_time = time.time() - start_time
+        if statistics.enabled:
+            statistics.finish_iteration(current_depth, nodes, iteration_time,
+                                        not timer.stopped)
+        if timer.stopped:
+            break
+        completed_depth = current_depth
+        if fixed_depth is not None and completed_depth >= fixed_depth:
+            break
+        if not timer.next_iteration(best_move, iteration_time):
+            break
+        root_moves.sort(key=lambda root_move: root_move[0] is not best_move)
+        current_depth += 1
+    finish_search(best_move, completed_depth, best_score, emit)
+    return best_move
+
+
+def minimizer(state, depth=1):
+    """
+    minimizer node analyzing the opponents moves
+    :param state: instance of Board representing a state of the game
+    :param depth: an integer value representing how deep into the search tree minimax goes
+    :return: an integer value that chooses the minimum from the child nodes
+    """
+    global nodes
+    nodes += 1
+    if timer.should_stop(nodes):
+        return 0
+    my_piece, other_piece = get_current_and_opponent_players(state)
+    if depth == max_depth:
+        if statistics.enabled:
+            statistics.leaves += 1
+        return (5 / depth) * evaluate_state(my_piece, other_piece)
+    legal_moves = state.current_player.legal_moves
+    best_score = float("inf")
+    for move in legal_moves:
+        next_state = state.current_player.make_move(move)
+        if next_state.move_status == MoveStatus.DONE:
+            # analyse_state(next_state.transition_board)
+            score = maximizer(next_state.transition_board, depth + 1)
+            if timer.stopped:
+                return 0
+            if score < best_score:
+                best_score = score
+    return best_score
+
+
+def maximizer(state, depth=1):
+    """
+    maximizer node analyzing the opponents moves
+    :param state: instance of Board representing a state of the game
+    :param depth: an integer value representing how deep into the search tree minimax goes
+    :return: an integer value that chooses the maximum from the child nodes
+    """
+    global nodes
+    nodes += 1
+    if timer.should_stop(nodes):
+        return 0
+    my_piece, other_piece = get_current_and_opponent_players(state)
+    if depth == max_depth:
+        if statistics.enabled:
+            statistics.leaves += 1
+        return (5 / depth) * evaluate_state(my_piece, other_piece)
+    legal_moves = state.current_player.legal_moves
+    best_score = float("-inf")
+    for move in legal_moves:
+        next_state = state.current_player.make_move(move)
+        if next_state.move_status == MoveStatus.DONE:
+            # analyse_state(next_state.transition_board)
+            score = minimizer(next_state.transition_board, depth + 1)
+            if timer.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+    return best_score
+
+
+def book_search(move_keys, depth=2, lines=3):
+    """
+    searches a state for the opening book builder in a process of its pool
+    :param move_keys: list of keys of the moves leading to the state from the standard
+                      board
+    :param depth: an integer value representing how deep into the search tree apb goes
+    :param lines: number of best root moves whose exact scores are returned
+    :return: list of tuples of the key of a root move and its score for the given number
+             of best root moves, best first, empty if there is no move
+    """
+    global my_team_color
+    state = play_moves(move_keys)
+    my_team_color = state.current_player.get_color()
+    root_moves = generate_root_moves(state)
+    if len(root_moves) == 0:
+        return []
+    transposition_table.clear()
+    timer.start_infinite(None)
+    ranking = multi_pv_root(root_moves, depth, lines)[0]
+    return [(move.get_key(), score) for move, score in ranking[:lines]]
+
+
+def principal_variation(state, move, length):
+    """
+    follows the best moves stored in the transposition table
+    :param state: instance of Board representing a state of the game
+    :param move: an instance of Move, the best move in the state
+    :param length: maximal number of moves
+    :return: list of Moves starting with the given one
+    """
+    variation = [move]
+    seen = set([state.hash_key])
+    state = state.current_player.make_move(move).transition_board
+    while len(variation) < length and state.hash_key not in seen:
+        seen.add(state.hash_key)
+        move = transposition_move(state)
+        if move is None:
+            break
+        variation.append(move)
+        state = state.current_player.make_move(move).transition_board
+    return variation
+
+
+def analyse_position(task):
+    """
+    analyses a single position in a process of the analysis pool
+    :param task: tuple of the number of the position, the position in the notation of
+                 Board.to_notation or in the encoding of Board.to_bytes, the SearchLimits
+                 of the analysis and True if the position is in the binary encoding
+    :return: dictionary with the best move, its score, the principal variation and
+             the number of nodes searched, or with the error if the input isn't a
+             position. A binary position is written in hexadecimal.
+    """
+    index, position, limits, binary = task
+    result = {"index": index, "position": position.encode("hex") if binary else position}
+    try:
+        if binary:
+            state = Board.from_bytes(position)
+        else:
+            state = Board.from_notation(position)
+    except Exception as error:
+        result["error"] = str(error)
+        return result
+    transposition_table.clear()
+    lines, summary = analyse_lines(state, limits)
+    if len(lines) == 0:
+        result["error"] = "no legal moves"
+        return result
+    best_move, score, variation = lines[0]
+    if score is not None:
+        result["mate"] = mate_moves(score)
+    result.update({"move": str(best_move), "move_key": best_move.get_key(), "score": score,
+                   "depth": summary["depth"], "nodes": summary["nodes"],
+                   "seconds": round(timer.elapsed(), 4),
+                   "pv": [str(move) for move in variation]})
+    if limits.lines > 1:
+        result["lines"] = [{"move": str(move), "move_key": move.get_key(),
+                            "score": line_score,
+                            "pv": [str(pv_move) for pv_move in line_variation]}
+                           for move, line_score, line_variation in lines]
+    return result
+
+
+def analyse_positions(input_path, output_path, pool, window, limits, binary=False):
+    """
+    streams positions through the analysis pool. At most window positions are read
+    ahead, so memory stays bounded whatever the size of the input. Results are written
+    in the order of the input. An existing output file is continued, so a stopped
+    analysis resumes after the last position written.
+    :param input_path: file with a position per line, or with the 65 byte encodings of
+                       Board.to_bytes one after another if binary is True, - for stdin
+    :param output_path: file the JSON lines are appended to, - for stdout
+    :param pool: multiprocessing.Pool the positions are analysed on
+    :param window: maximal number of positions being analysed or waiting to be written
+    :param limits: instance of SearchLimits applied to every position
+    :param binary: True if the positions are in the encoding of Board.to_bytes
+    """
+    done = 0
+    if output_path != "-" and os.path.exists(output_path):
+        output_file = open(output_path, "r+")
+        written = 0
+        line = output_file.readline()
+        while line.endswith("\n"):
+            done += 1
+            written += len(line)
+            line = output_file.readline()
+        output_file.seek(written)
+        output_file.truncate()
+    elif output_path != "-":
+        output_file = open(output_path, "w")
+    else:
+        output_file = sys.stdout
+    if input_path == "-":
+        input_file = sys.stdin
+    else:
+        input_file = open(input_path, "rb" if binary else "r")
+    if binary:
+        record_size = BoardProperties.NUM_TILES + 1
+        positions = iter(lambda: input_file.read(record_size), "")
+    else:
+        positions = (line.strip() for line in input_file)
+    pending = collections.deque()
+    for index, position in enumerate(positions, 1):
+        if index <= done:
+            continue
+        pending.append(pool.apply_async(analyse_position,
+                                        ((index, position, limits, binary),)))
+        if len(pending) >= window:
+            output_file.write(json.dumps(pending.popleft().get(), sort_keys=True) + "\n")
+            output_file.flush()
+    while len(pending) > 0:
+        output_file.write(json.dumps(pending.popleft().get(), sort_keys=True) + "\n")
+        output_file.flush()
+
+
+def configure(remaining_time=60.0, increment=0.0, smp=0, workers=0, eval_cache_size=2 ** 16,
+              pawn_table_size=2 ** 12, tablebase_directory=None, statistics_sink=None,
+              collect_statistics=False, search="alphabeta", depth=None, disabled_terms=()):
+    """
+    sets up the tables, the caches and the processes of the search. They are kept
+    between searches until configure is called again.
+    :param remaining_time: seconds left on our clock
+    :param increment: seconds added to our clock after every move
+    :param smp: number of helper processes searching along with lazy smp
+    :param workers: number of worker processes the root moves are split across
+    :param eval_cache_size: number of evaluations the evaluation cache holds, 0 to
+                            disable it
+    :param pawn_table_size: number of pawn structures the pawn table holds, 0 to
+                            disable it
+    :param tablebase_directory: directory of the tablebase files, None to play without
+    :param statistics_sink: file like object receiving a JSON line of statistics per
+                            search, None to write none
+    :param collect_statistics: True to count the statistics returned by analyse even
+                               without a sink
+    :param search: "alphabeta" or "minimax", the search function choosing our moves
+    :param depth: depth every move is searched to, None to search until the time runs out
+    :param disabled_terms: names from evaluation_term_names left out of the evaluation
+    """
+    global smp_helpers, split_workers, statistics, transposition_table, evaluation_cache, \
+        pawn_table, tablebases, split_stop_event, worker_pool, search_function, \
+        fixed_depth, evaluation_terms
+    if search not in ["alphabeta", "minimax"]:
+        raise Exception("Value Error: " + search + " is not a search function.")
+    for term in disabled_terms:
+        if term not in evaluation_term_names:
+            raise Exception("Value Error: " + term + " is not an evaluation term.")
+    search_function = search
+    fixed_depth = depth
+    evaluation_terms = set(evaluation_term_names) - set(disabled_terms)
+    timer.update_clock(remaining_time, increment)
+    smp_helpers = smp
+    split_workers = workers
+    statistics = SearchStatistics(statistics_sink,
+                                  collect_statistics or statistics_sink is not None)
+    if smp > 0:
+        transposition_table = SharedTranspositionTable()
+    else:
+        transposition_table = TranspositionTable()
+    evaluation_cache = EvaluationCache(eval_cache_size) if eval_cache_size > 0 else None
+    pawn_table = PawnTable(pawn_table_size) if pawn_table_size > 0 else None
+    tablebases = None
+    if tablebase_directory is not None:
+        tablebases = Tablebases(tablebase_directory)
+    if worker_pool is not None:
+        worker_pool.terminate()
+        worker_pool = None
+    split_stop_event = multiprocessing.Event()
+    if workers > 0:
+        sys.stdout.flush()
+        worker_pool = multiprocessing.Pool(workers, init_split_worker, (split_stop_event,))
+
+
+def analyse(board, limits=None, history=()):
+    """
+    searches a state within the given limits. The transposition table and the caches
+    are kept from the previous searches.
+    :param board: instance of Board representing a state of the game
+    :param limits: instance of SearchLimits, None for the default limits
+    :param history: list of the instances of Board the game went through before the
+                    given state, whose repetitions are draws
+    :return: tuple of the best Move, its score, the principal variation as a list of
+             Moves and a dictionary of statistics; the Move and the score are None if
+             there is no legal move
+    """
+    lines, summary = analyse_lines(board, limits, history)
+    if len(lines) == 0:
+        return None, None, [], summary
+    best_move, score, variation = lines[0]
+    return best_move, score, variation, summary
+
+
+def analyse_lines(board, limits=None, history=()):
+    """
+    searches a state within the given limits for as many best root moves as the limits
+    ask for. All the lines share the transposition table, so they cost much less than
+    searching the state once per line with the other moves excluded.
+    :param board: instance of Board representing a state of the game
+    :param limits: instance of SearchLimits, None for the default limits
+    :param history: list of the instances of Board the game went through before the
+                    given state, whose repetitions are draws
+    :return: tuple of the list of tuples of a Move, its score and its principal
+             variation, best first, and a dictionary of statistics; the list is empty if
+             there is no legal move
+    """
+    global my_team_color, position_counts
+    if limits is None:
+        limits = SearchLimits()
+    my_team_color = board.current_player.get_color()
+    root_moves = generate_root_moves(board)
+    if len(root_moves) == 0:
+        return [], {}
+    position_counts = {}
+    for state in list(history) + [board]:
+        remember_position(state)
+    if limits.seconds is not None:
+        timer.start_fixed(limits.seconds)
+    else:
+        timer.start_infinite(None)
+    best_move, depth, score = iterative_deepening(root_moves, depth_limit=limits.depth,
+                                                  lines=limits.lines)
+    lines = []
+    for move, line_score in search_lines:
+        if line_score in [float("inf"), float("-inf")]:
+            line_score = None
+        lines.append((move, line_score, principal_variation(board, move, max(depth, 1))))
+    return lines, statistics.summary(nodes, best_move, depth, lines[0][1])
+
@@ -0,0 +1,128 @@
+"""Implements search statistics for the Alice Chess Engine"""
+import json
+import time
+
+
+class SearchStatistics:
+    __doc__ = "Counts what happens during a search and writes one JSON line per search " \
+              "to a sink. Without a sink the statistics are disabled unless asked for, " \
+              "and the search skips counting altogether by checking the enabled flag first."
+
+    def __init__(self, sink=None, enabled=None):
+        """
+        Initializes the statistics
+        :param sink: file like object receiving the JSON lines, None to write none
+        :param enabled: True to count without a sink, None to count only with a sink
+        """
+        self.sink = sink
+        self.enabled = sink is not None if enabled is None else enabled
+        self.start()
+
+    def start(self):
+        """
+        resets all the counters for a new search
+        """
+        self.start_time = time.time()
+        self.leaves = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.table_probes = 0
+        self.table_hits = 0
+        self.table_cutoffs = 0
+        self.evaluation_probes = 0
+        self.evaluation_hits = 0
+        self.pawn_probes = 0
+        self.pawn_hits = 0
+        self.iterations = []
+        self.iteration_nodes = 0
+        self.iteration_leaves = 0
+
+    def cutoff(self, searched_moves):
+        """
+        counts a beta cutoff
+        :param searched_moves: number of moves searched before the cutoff
+        """
+        self.beta_cutoffs += 1
+        if searched_moves == 1:
+            self.first_move_cutoffs += 1
+
+    def finish_iteration(self, depth, nodes, seconds, completed):
+        """
+        records an iteration of iterative deepening
+        :param depth: depth of the iteration
+        :param nodes: number of nodes searched since the start of the search
+        :param seconds: time the iteration took
+        :param completed: False if the iteration was stopped before its end
+        """
+        iteration_nodes = nodes - self.iteration_nodes
+        self.iterations.append({"depth": depth,
+                                "nodes": iteration_nodes,
+                                "leaves": self.leaves - self.iteration_leaves,
+                                "seconds": round(seconds, 4),
+                                "nps": int(iteration_nodes / seconds) if seconds > 0 else 0,
+                                "completed": completed})
+        self.iteration_nodes = nodes
+        self.iteration_leaves = self.leaves
+
+    def summary(self, nodes, move, depth, score):
+        """
+        summarizes the search
+        :param nodes: number of nodes searched
+        :param move: the best move found
+        :param depth: depth of the last completed iteration
+        :param score: score of the best move
+        :return: dictionary holding the statistics of the search
+        """
+        seconds = time.time() - self.start_time
+        completed = [iteration for iteration in self.iterations if iteration["completed"]]
+        branching_factor = None
+        if len(completed) >= 2 and completed[-2]["nodes"] > 0:
+            branching_factor = round(float(completed[-1]["nodes"]) / completed[-2]["nodes"], 3)
+        if score in [float("inf"), float("-inf")]:
+            score = None
+        return {"move": str(move),
+                "depth": depth,
+                "score": score,
+                "seconds": round(seconds, 4),
+                "nodes": nodes,
+                "leaves": self.leaves,
+                "nps": int(nodes / seconds) if seconds > 0 else 0,
+                "beta_cutoff_rate": SearchStatistics.rate(self.beta_cutoffs,
+                                                          self.table_probes -
+                                                          self.table_cutoffs),
+                "first_move_cutoff_rate": SearchStatistics.rate(self.first_move_cutoffs,
+                                                                self.beta_cutoffs),
+                "table_hit_rate": SearchStatistics.rate(self.table_hits, self.table_probes),
+                "table_cutoff_rate": SearchStatistics.rate(self.table_cutoffs,
+                                                           self.table_probes),
+                "evaluation_hit_rate": SearchStatistics.rate(self.evaluation_hits,
+                                                             self.evaluation_probes),
+                "pawn_hit_rate": SearchStatistics.rate(self.pawn_hits, self.pawn_probes),
+                "branching_factor": branching_factor,
+                "iterations": self.iterations}
+
+    def emit(self, nodes, move, depth, score):
+        """
+        writes the summary of the search as a JSON line to the sink
+        :param nodes: number of nodes searched
+        :param move: the best move found
+        :param depth: depth of the last completed iteration
+        :param score: score of the best move
+        """
+        if self.sink is None:
+            return
+        self.sink.write(json.dumps(self.summary(nodes, move, depth, score),
+                                   sort_keys=True) + "\n")
+        self.sink.flush()
+
+    @staticmethod
+    def rate(count, total):
+        """
+        divides two counters
+        :param count: number of times something happened
+        :param total: number of times it could have happened
+        :return: the share rounded to 4 digits or None if it could never happen
+        """
+        if total == 0:
+            return None
+        return round(float(count) / total, 4)
@@ -0,0 +1,572 @@
+"""Implements endgame tablebases for the Alice Chess Engine"""
+import os
+import sys
+import mmap
+import random
+import struct
+from aliceengine import *
+
+
+class TablebaseValue:
+    __doc__ = "A wrapper class for the values stored in a tablebase. A value between " \
+              "1 and 254 is one more than the number of plies to mate, an odd value " \
+              "means the player to move gets mated, an even value means he mates."
+    DRAW = 0
+    INVALID = 255
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def is_win(value):
+        """
+        checks if the player to move wins
+        :param value: value stored in a tablebase
+        :return: True if the player to move mates else False
+        """
+        return value != TablebaseValue.INVALID and value != TablebaseValue.DRAW and \
+            value % 2 == 0
+
+    @staticmethod
+    def is_loss(value):
+        """
+        checks if the player to move loses
+        :param value: value stored in a tablebase
+        :return: True if the player to move gets mated else False
+        """
+        return value != TablebaseValue.INVALID and value % 2 == 1
+
+    @staticmethod
+    def plies_to_mate(value):
+        """
+        gives the distance to mate
+        :param value: value stored in a tablebase for a won or lost state
+        :return: number of plies until mate with best play of both players
+        """
+        return value - 1
+
+
+class Material:
+    __doc__ = "Describes a set of pieces, like KQvK, and numbers all the placements of " \
+              "these pieces on both boards. A placement is given by a tile number " \
+              "between 0 and 127 for every piece, 64 and above being on the second board. " \
+              "Swapping the boards doesn't change a state, so the white King is always " \
+              "put on the first board."
+    PIECE_ORDER = "KQRBN"
+
+    def __init__(self, signature):
+        """
+        Initializer of this class
+        :param signature: string like KQvK listing the white and the black pieces
+        """
+        white, black = signature.upper().split("V")
+        if white[0] != "K" or black[0] != "K" or \
+                len(white.replace("K", "")) != len(white) - 1 or \
+                len(black.replace("K", "")) != len(black) - 1:
+            raise Exception("Value Error: " + signature + " needs exactly one King a side.")
+        for symbol in white + black:
+            if symbol not in Material.PIECE_ORDER:
+                raise Exception("Value Error: " + symbol + " pieces are not supported.")
+        white_extras = sorted(white[1:], key=Material.PIECE_ORDER.index)
+        black_extras = sorted(black[1:], key=Material.PIECE_ORDER.index)
+        self.signature = "K" + "".join(white_extras) + "vK" + "".join(black_extras)
+        self.types = ["K", "K"] + white_extras + black_extras
+        self.colors = [0, 1] + [0] * len(white_extras) + [1] * len(black_extras)
+        self.size = 2 * 64 * 128 ** (len(self.types) - 1)
+
+    def index(self, tiles, side):
+        """
+        numbers a placement of the pieces
+        :param tiles: list of tile numbers in the order of the pieces of this material
+        :param side: 0 if white moves next, 1 if black does
+        :return: non negative integer smaller than size
+        """
+        flip = tiles[0] & 64
+        index = 0
+        for tile in reversed(tiles[1:]):
+            index = index * 128 + (tile ^ flip)
+        return ((index * 64 + (tiles[0] ^ flip)) << 1) | side
+
+    def placement(self, index):
+        """
+        gives the placement numbered by index
+        :param index: non negative integer smaller than size
+        :return: tuple of the list of tile numbers and the side to move
+        """
+        side = index & 1
+        index >>= 1
+        tiles = [index % 64]
+        index //= 64
+        for piece in range(len(self.types) - 1):
+            tiles.append(index % 128)
+            index //= 128
+        return tiles, side
+
+    def without(self, piece):
+        """
+        gives the material left after a piece got captured
+        :param piece: position of the captured piece in the pieces of this material
+        :return: an instance of Material
+        """
+        white = "".join(self.types[i] for i in range(len(self.types))
+                        if self.colors[i] == 0 and i != piece)
+        black = "".join(self.types[i] for i in range(len(self.types))
+                        if self.colors[i] == 1 and i != piece)
+        return Material(white + "v" + black)
+
+
+def piece_rays(piece_class):
+    """
+    lists the lines a piece walks along from every index of a board, following the same
+    offsets and column exceptions as the valid_moves of the piece
+    :param piece_class: one of King, Queen, Rook, Bishop and Knight
+    :return: list with a list of rays for every index, a ray being a list of indexes
+    """
+    exceptions = []
+    for name in ["first_column_exception", "second_column_exception",
+                 "seventh_column_exception", "eighth_column_exception",
+                 "in_first_column_exception", "in_eighth_column_exception"]:
+        if hasattr(piece_class, name):
+            exceptions.append(getattr(piece_class, name))
+    slider = piece_class in [Queen, Rook, Bishop]
+    rays = []
+    for index in range(BoardProperties.NUM_TILES):
+        index_rays = []
+        for offset in piece_class.valid_move_offsets:
+            ray = []
+            current = index
+            while True:
+                if any(exception(offset, current) for exception in exceptions):
+                    break
+                current += offset
+                if not 0 <= current < BoardProperties.NUM_TILES:
+                    break
+                ray.append(current)
+                if not slider:
+                    break
+            if len(ray) > 0:
+                index_rays.append(ray)
+        rays.append(index_rays)
+    return rays
+
+
+RAYS = {"K": piece_rays(King), "Q": piece_rays(Queen), "R": piece_rays(Rook),
+        "B": piece_rays(Bishop), "N": piece_rays(Knight)}
+
+
+class TablebaseGenerator:
+    __doc__ = "Generates the tablebase of a material by retrograde analysis. Moves " \
+              "follow the rules of the engine: a piece walks on its own board, lands " \
+              "on the same tile of the other board which has to be empty, captures on " \
+              "its own board and may not leave its King attacked on either board."
+
+    def __init__(self, material, subtables):
+        """
+        Initializer of this class
+        :param material: instance of Material
+        :param subtables: dictionary from signature to the values of every material left
+                          after a capture
+        """
+        self.material = material
+        self.subtables = subtables
+        self.types = material.types
+        self.colors = material.colors
+        self.rays = [RAYS[piece_type] for piece_type in material.types]
+
+    def is_attacked(self, tiles, king):
+        """
+        checks if a King can be captured
+        :param tiles: list of tile numbers, -1 for captured pieces
+        :param king: position of the King in the pieces
+        :return: True if an opponent's piece can capture the King else False
+        """
+        king_tile = tiles[king]
+        if king_tile ^ 64 in tiles:
+            return False
+        board = king_tile & 64
+        king_index = king_tile & 63
+        color = self.colors[king]
+        for piece in range(len(tiles)):
+            tile = tiles[piece]
+            if tile < 0 or self.colors[piece] == color or tile & 64 != board:
+                continue
+            for ray in self.rays[piece][tile & 63]:
+                for index in ray:
+                    if index == king_index:
+                        return True
+                    if (board | index) ^ 64 in tiles:
+                        continue
+                    if board | index in tiles:
+                        break
+        return False
+
+    def legal_moves(self, tiles, side):
+        """
+        generates the legal moves of a placement
+        :param tiles: list of tile numbers
+        :param side: 0 if white moves next, 1 if black does
+        :return: list of tuples of the moving piece, its destination tile and the
+                 captured piece or None
+        """
+        moves = []
+        king = side
+        for piece in range(len(tiles)):
+            if self.colors[piece] != side:
+                continue
+            board = tiles[piece] & 64
+            for ray in self.rays[piece][tiles[piece] & 63]:
+                for index in ray:
+                    destination = (board | index) ^ 64
+                    if destination in tiles:
+                        continue
+                    captured = None
+                    if board | index in tiles:
+                        captured = tiles.index(board | index)
+                        if self.colors[captured] == side:
+                            break
+                    here = list(tiles)
+                    there = list(tiles)
+                    if captured is not None:
+                        here[captured] = -1
+                        there[captured] = -1
+                    here[piece] = board | index
+                    there[piece] = destination
+                    if not self.is_attacked(here, king) and \
+                            not self.is_attacked(there, king):
+                        moves.append((piece, destination, captured))
+                    if captured is not None:
+                        break
+        return moves
+
+    def predecessors(self, tiles, side):
+        """
+        generates the placements from which a move without capture leads to the given one
+        :param tiles: list of tile numbers
+        :param side: 0 if white moves next, 1 if black does
+        :return: list of indexes of the preceding placements
+        """
+        indexes = []
+        mover = 1 - side
+        for piece in range(len(tiles)):
+            if self.colors[piece] != mover:
+                continue
+            board = (tiles[piece] & 64) ^ 64
+            destination_index = tiles[piece] & 63
+            if board | destination_index in tiles:
+                continue
+            for ray in self.rays[piece][destination_index]:
+                for index in ray:
+                    origin = board | index
+                    if origin in tiles:
+                        if origin ^ 64 not in tiles:
+                            break
+                        continue
+                    previous = list(tiles)
+                    previous[piece] = origin
+                    if self.is_attacked(previous, side):
+                        continue
+                    here = list(tiles)
+                    here[piece] = board | destination_index
+                    if self.is_attacked(here, mover):
+                        continue
+                    indexes.append(self.material.index(previous, mover))
+        return indexes
+
+    def generate(self):
+        """
+        calculates the value of every placement of the material
+        :return: bytearray with a TablebaseValue for every index of the material
+        """
+        size = self.material.size
+        values = bytearray(size)
+        counts = bytearray(size)
+        floors = bytearray(size)
+        resolved = bytearray(size)
+        buckets = {}
+        for index in range(size):
+            tiles, side = self.material.placement(index)
+            if len(set(tiles)) != len(tiles) or self.is_attacked(tiles, 1 - side):
+                values[index] = TablebaseValue.INVALID
+                resolved[index] = 1
+                continue
+            moves = self.legal_moves(tiles, side)
+            if len(moves) == 0:
+                if self.is_attacked(tiles, side):
+                    buckets.setdefault(0, []).append((index, False))
+                else:
+                    resolved[index] = 1
+                continue
+            count = 0
+            floor = 0
+            for piece, destination, captured in moves:
+                if captured is None:
+                    count += 1
+                    continue
+                subtable = self.material.without(captured)
+                after = list(tiles)
+                after[piece] = destination
+                del after[captured]
+                value = self.subtables[subtable.signature][subtable.index(after, 1 - side)]
+                if TablebaseValue.is_loss(value):
+                    # the capture wins, so the placement must never be queued as a loss
+                    count += 1
+                    buckets.setdefault(value, []).append((index, True))
+                elif TablebaseValue.is_win(value):
+                    floor = max(floor, value)
+                else:
+                    count += 1
+            counts[index] = count
+            floors[index] = floor
+            if count == 0:
+                buckets.setdefault(floor, []).append((index, False))
+        plies = 0
+        while plies <= max(buckets.keys() + [-1]):
+            for index, is_win in buckets.pop(plies, []):
+                if resolved[index]:
+                    continue
+                resolved[index] = 1
+                values[index] = plies + 1
+                tiles, side = self.material.placement(index)
+                for previous in self.predecessors(tiles, side):
+                    if resolved[previous]:
+                        continue
+                    if not is_win:
+                        buckets.setdefault(plies + 1, []).append((previous, True))
+                    else:
+                        counts[previous] -= 1
+                        if counts[previous] == 0:
+                            loss_plies = max(plies + 1, floors[previous])
+                            buckets.setdefault(loss_plies, []).append((previous, False))
+            plies += 1
+        return values
+
+
+def minimax_value(generator, tiles, side, depth):
+    """
+    searches the value of a placement by plain minimax, looking up the values after
+    captures in the subtables of the generator
+    :param generator: instance of TablebaseGenerator
+    :param tiles: list of tile numbers
+    :param side: 0 if white moves next, 1 if black does
+    :param depth: number of plies searched without capture
+    :return: TablebaseValue of the placement or None if it isn't mated within depth plies
+    """
+    moves = generator.legal_moves(tiles, side)
+    if len(moves) == 0:
+        return 1 if generator.is_attacked(tiles, side) else TablebaseValue.DRAW
+    if depth == 0:
+        return None
+    best_win = None
+    longest_loss = 0
+    all_lose = True
+    for piece, destination, captured in moves:
+        after = list(tiles)
+        after[piece] = destination
+        if captured is not None:
+            subtable = generator.material.without(captured)
+            del after[captured]
+            value = generator.subtables[subtable.signature][subtable.index(after, 1 - side)]
+        else:
+            value = minimax_value(generator, after, 1 - side, depth - 1)
+        if value is not None and TablebaseValue.is_loss(value):
+            best_win = value + 1 if best_win is None else min(best_win, value + 1)
+        elif value is not None and TablebaseValue.is_win(value):
+            longest_loss = max(longest_loss, value + 1)
+        else:
+            all_lose = False
+    if best_win is not None:
+        # a shorter win may lie beyond the depth of the search
+        if TablebaseValue.plies_to_mate(best_win) <= depth:
+            return best_win
+        return None
+    if all_lose:
+        return longest_loss
+    return None
+
+
+def verify_tablebase(generator, values, samples=100, depth=3, seed=0):
+    """
+    cross checks generated values against plain minimax on randomly sampled placements.
+    Placements mated within depth plies, or resolved through captures, must get the same
+    value from both; the others must not be mated within depth plies.
+    :param generator: instance of TablebaseGenerator which generated the values
+    :param values: bytearray returned by generate
+    :param samples: number of valid placements checked
+    :param depth: number of plies searched without capture
+    :param seed: seed of the sampling
+    :return: list of tuples of the index, the generated and the searched value of every
+             placement where they differ
+    """
+    rnd = random.Random(seed)
+    mismatches = []
+    checked = 0
+    while checked < samples:
+        index = rnd.randrange(generator.material.size)
+        if values[index] == TablebaseValue.INVALID:
+            continue
+        checked += 1
+        tiles, side = generator.material.placement(index)
+        value = minimax_value(generator, tiles, side, depth)
+        if value is None:
+            if values[index] != TablebaseValue.DRAW and \
+                    TablebaseValue.plies_to_mate(values[index]) <= depth:
+                mismatches.append((index, values[index], value))
+        elif value != values[index]:
+            mismatches.append((index, values[index], value))
+    return mismatches
+
+
+def generate_tablebases(signature, directory):
+    """
+    generates the tablebase of a material and of every material left after captures and
+    writes them to a directory
+    :param signature: string like KQvK listing the white and the black pieces
+    :param directory: directory the tablebase files are written to
+    :return: dictionary from signature to the values of every generated material
+    """
+    tables = {}
+    pending = [Material(signature)]
+    order = []
+    while len(pending) > 0:
+        material = pending.pop()
+        if material.signature in [known.signature for known in order]:
+            continue
+        order.append(material)
+        for piece in range(2, len(material.types)):
+            pending.append(material.without(piece))
+    for material in reversed(order):
+        path = os.path.join(directory, material.signature + Tablebase.EXTENSION)
+        if os.path.exists(path):
+            tables[material.signature] = bytearray(Tablebase(path).data)
+            continue
+        tables[material.signature] = TablebaseGenerator(material, tables).generate()
+        Tablebase.write(path, material, tables[material.signature])
+    return tables
+
+
+class Tablebase:
+    __doc__ = "A tablebase file of a single material. The values are memory mapped, so " \
+              "probing reads a single byte and every engine process shares the pages."
+    MAGIC = "ALICETB1"
+    EXTENSION = ".atb"
+    HEADER = struct.Struct(">8s16sQ")
+
+    def __init__(self, path):
+        """
+        Opens a tablebase written by Tablebase.write
+        :param path: path of the tablebase file
+        """
+        self.tablebase_file = open(path, "rb")
+        mapped = mmap.mmap(self.tablebase_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, signature, size = Tablebase.HEADER.unpack_from(mapped, 0)
+        if magic != Tablebase.MAGIC:
+            raise Exception("Value Error: " + path + " is not a tablebase.")
+        self.material = Material(signature.rstrip("\0"))
+        self.mapped = mapped
+        self.data = buffer(mapped, Tablebase.HEADER.size, size)
+
+    def probe(self, tiles, side):
+        """
+        looks up the value of a placement
+        :param tiles: list of tile numbers in the order of the pieces of the material
+        :param side: 0 if white moves next, 1 if black does
+        :return: TablebaseValue of the placement
+        """
+        return ord(self.data[self.material.index(tiles, side)])
+
+    @staticmethod
+    def write(path, material, values):
+        """
+        writes a tablebase file
+        :param path: path of the tablebase file
+        :param material: instance of Material the values belong to
+        :param values: bytearray with a TablebaseValue for every index of the material
+        """
+        tablebase_file = open(path, "wb")
+        tablebase_file.write(Tablebase.HEADER.pack(Tablebase.MAGIC, material.signature,
+                                                   len(values)))
+        tablebase_file.write(values)
+        tablebase_file.close()
+
+
+class Tablebases:
+    __doc__ = "All the tablebases found in a directory, probed with states of the game"
+
+    def __init__(self, directory):
+        """
+        Opens every tablebase file of a directory
+        :param directory: directory holding tablebase files
+        """
+        self.tables = {}
+        self.max_pieces = 0
+        for name in os.listdir(directory):
+            if name.endswith(Tablebase.EXTENSION):
+                tablebase = Tablebase(os.path.join(directory, name))
+                self.tables[tablebase.material.signature] = tablebase
+                self.max_pieces = max(self.max_pieces, len(tablebase.material.types))
+
+    def probe(self, state):
+        """
+        looks up the value of a state of the game
+        :param state: instance of Board
+        :return: TablebaseValue for the player to move or None if there is no tablebase
+                 for the pieces of the state
+        """
+        if len(state.white_piece) + len(state.black_piece) > self.max_pieces:
+            return None
+        side = 0 if state.current_player.get_color() == PlayerColor.White else 1
+        for pieces, other_pieces, flipped in [(state.white_piece, state.black_piece, 0),
+                                              (state.black_piece, state.white_piece, 1)]:
+            own = Tablebases.sort_pieces(pieces)
+            other = Tablebases.sort_pieces(other_pieces)
+            signature = "".join(str(piece).upper() for piece in own) + "v" + \
+                        "".join(str(piece).upper() for piece in other)
+            if signature in self.tables:
+                tiles = [Tablebases.tile(own[0]), Tablebases.tile(other[0])] + \
+                        [Tablebases.tile(piece) for piece in own[1:] + other[1:]]
+                return self.tables[signature].probe(tiles, side ^ flipped)
+        return None
+
+    @staticmethod
+    def sort_pieces(pieces):
+        """
+        orders pieces like the pieces of a Material, the King first
+        :param pieces: list of Pieces of one player
+        :return: sorted list of Pieces
+        """
+        return sorted(pieces, key=lambda piece: Material.PIECE_ORDER.find(str(piece).upper())
+                      if str(piece).upper() in Material.PIECE_ORDER else len(Material.PIECE_ORDER))
+
+    @staticmethod
+    def tile(piece):
+        """
+        gives the tile number of a piece
+        :param piece: instance of Piece
+        :return: integer between 0 and 127
+        """
+        return (int(piece.position.board) - 1) * BoardProperties.NUM_TILES + \
+            piece.position.index
+
+
+if __name__ == "__main__":
+    verify = len(sys.argv) > 1 and sys.argv[1] == "--verify"
+    arguments = sys.argv[2:] if verify else sys.argv[1:]
+    if len(arguments) < 2:
+        sys.stderr.write("usage: python alicetablebase.py [--verify] DIRECTORY "
+                         "SIGNATURE...\n")
+        sys.exit(1)
+    failed = False
+    for signature in arguments[1:]:
+        generated = generate_tablebases(signature, arguments[0])
+        if not verify:
+            continue
+        material = Material(signature)
+        mismatches = verify_tablebase(TablebaseGenerator(material, generated),
+                                      generated[material.signature])
+        for index, value, searched in mismatches:
+            sys.stdout.write(material.signature + " " + str(index) + ": generated " +
+                             str(value) + ", searched " + str(searched) + "\n")
+        sys.stdout.write(material.signature + ": " + str(len(mismatches)) +
+                         " mismatches\n")
+        failed = failed or len(mismatches) > 0
+    sys.exit(1 if failed else 0)
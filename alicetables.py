@@ -0,0 +1,232 @@
+"""Implements the hash tables used by the Alice Chess Engine search"""
+import ctypes
+from multiprocessing.sharedctypes import RawArray
+
+
+class BoundType:
+    __doc__ = "A wrapper class for the kinds of scores stored in the transposition table"
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class TranspositionTable:
+    __doc__ = "A fixed size table remembering the results of searched states, indexed " \
+              "by the hash key of the state."
+
+    def __init__(self, size=2 ** 18):
+        """
+        Initializes an empty table
+        :param size: number of entries the table can hold
+        """
+        self.size = size
+        self.entries = [None] * size
+
+    def probe(self, hash_key):
+        """
+        looks up the stored result for a state
+        :param hash_key: hash key of the state
+        :return: tuple of (depth, score, bound, move key) or None if the state isn't stored
+        """
+        entry = self.entries[hash_key % self.size]
+        if entry is None or entry[0] != hash_key:
+            return None
+        return entry[1:]
+
+    def store(self, hash_key, depth, score, bound, move_key):
+        """
+        stores the result of a search. A stored result of a different state is
+        replaced, a deeper result of the same state is kept.
+        :param hash_key: hash key of the searched state
+        :param depth: depth the state was searched to
+        :param score: score found by the search
+        :param bound: BoundType telling if the score is exact or a bound
+        :param move_key: key of the best Move found, None if there is none
+        """
+        index = hash_key % self.size
+        entry = self.entries[index]
+        if entry is not None and entry[0] == hash_key and entry[1] > depth:
+            return
+        self.entries[index] = (hash_key, depth, score, bound, move_key)
+
+    def clear(self):
+        """
+        removes all the entries from the table
+        """
+        self.entries = [None] * self.size
+
+
+class SharedTranspositionTable:
+    __doc__ = "A transposition table kept in shared memory so that search processes " \
+              "forked after its creation can use it together. Entries are written " \
+              "without locks; every entry stores its data and the hash key xor the data " \
+              "so that a torn entry written by two processes at once is never returned."
+    SCORE_SCALE = 100
+    SCORE_OFFSET = 2 ** 31
+    POSITIVE_INFINITY = 2 ** 32 - 1
+    NEGATIVE_INFINITY = 0
+
+    def __init__(self, size=2 ** 18):
+        """
+        Initializes an empty table in shared memory
+        :param size: number of entries the table can hold
+        """
+        self.size = size
+        self.entries = RawArray(ctypes.c_uint64, 2 * size)
+
+    @staticmethod
+    def pack(depth, score, bound, move_key):
+        """
+        packs a search result into a 64 bit integer
+        :param depth: depth the state was searched to
+        :param score: score found by the search
+        :param bound: BoundType of the score
+        :param move_key: key of the best Move found, None if there is none
+        :return: integer holding all the given values
+        """
+        if score == float("inf"):
+            packed_score = SharedTranspositionTable.POSITIVE_INFINITY
+        elif score == float("-inf"):
+            packed_score = SharedTranspositionTable.NEGATIVE_INFINITY
+        else:
+            packed_score = int(round(score * SharedTranspositionTable.SCORE_SCALE)) + \
+                           SharedTranspositionTable.SCORE_OFFSET
+        packed_move = 0 if move_key is None else move_key + 1
+        return packed_score << 24 | packed_move << 10 | min(depth, 255) << 2 | bound
+
+    @staticmethod
+    def unpack(data):
+        """
+        unpacks a search result packed by pack
+        :param data: integer holding a search result
+        :return: tuple of (depth, score, bound, move key)
+        """
+        packed_score = data >> 24
+        if packed_score == SharedTranspositionTable.POSITIVE_INFINITY:
+            score = float("inf")
+        elif packed_score == SharedTranspositionTable.NEGATIVE_INFINITY:
+            score = float("-inf")
+        else:
+            score = float(packed_score - SharedTranspositionTable.SCORE_OFFSET) / \
+                    SharedTranspositionTable.SCORE_SCALE
+        packed_move = (data >> 10) & 0x3FFF
+        move_key = None if packed_move == 0 else packed_move - 1
+        return (data >> 2) & 0xFF, score, data & 0x3, move_key
+
+    def probe(self, hash_key):
+        """
+        looks up the stored result for a state
+        :param hash_key: hash key of the state
+        :return: tuple of (depth, score, bound, move key) or None if the state isn't stored
+        """
+        index = 2 * (hash_key % self.size)
+        check = self.entries[index]
+        data = self.entries[index + 1]
+        if check ^ data != hash_key or data == 0:
+            return None
+        return SharedTranspositionTable.unpack(data)
+
+    def store(self, hash_key, depth, score, bound, move_key):
+        """
+        stores the result of a search. A stored result of a different state is
+        replaced, a deeper result of the same state is kept.
+        :param hash_key: hash key of the searched state
+        :param depth: depth the state was searched to
+        :param score: score found by the search
+        :param bound: BoundType telling if the score is exact or a bound
+        :param move_key: key of the best Move found, None if there is none
+        """
+        index = 2 * (hash_key % self.size)
+        data = self.entries[index + 1]
+        if self.entries[index] ^ data == hash_key and data != 0 and \
+                (data >> 2) & 0xFF > depth:
+            return
+        data = SharedTranspositionTable.pack(depth, score, bound, move_key)
+        self.entries[index] = hash_key ^ data
+        self.entries[index + 1] = data
+
+    def clear(self):
+        """
+        removes all the entries from the table
+        """
+        ctypes.memset(self.entries, 0, ctypes.sizeof(self.entries))
+
+
+class EvaluationCache:
+    __doc__ = "A fixed size table remembering the evaluations of states, indexed by the " \
+              "hash key of the state. A new evaluation always replaces the one stored at " \
+              "its index."
+
+    def __init__(self, size=2 ** 16):
+        """
+        Initializes an empty cache
+        :param size: number of evaluations the cache can hold
+        """
+        self.size = size
+        self.entries = [None] * size
+
+    def probe(self, hash_key, color):
+        """
+        looks up the stored evaluation of a state
+        :param hash_key: hash key of the state
+        :param color: color of the player the evaluation was made for
+        :return: the evaluation or None if the state isn't stored
+        """
+        entry = self.entries[hash_key % self.size]
+        if entry is None or entry[0] != hash_key or entry[1] != color:
+            return None
+        return entry[2]
+
+    def store(self, hash_key, color, score):
+        """
+        stores the evaluation of a state
+        :param hash_key: hash key of the state
+        :param color: color of the player the evaluation was made for
+        :param score: the evaluation
+        """
+        self.entries[hash_key % self.size] = (hash_key, color, score)
+
+    def clear(self):
+        """
+        removes all the entries from the cache
+        """
+        self.entries = [None] * self.size
+
+
+class PawnTable:
+    __doc__ = "A fixed size table remembering the scores of pawn structures, indexed by " \
+              "the pawn key of the state. Scores are stored for white, so both players " \
+              "share the entries."
+
+    def __init__(self, size=2 ** 12):
+        """
+        Initializes an empty table
+        :param size: number of pawn structures the table can hold
+        """
+        self.size = size
+        self.entries = [None] * size
+
+    def probe(self, pawn_key):
+        """
+        looks up the stored score of a pawn structure
+        :param pawn_key: pawn key of the state
+        :return: the score for white or None if the pawn structure isn't stored
+        """
+        entry = self.entries[pawn_key % self.size]
+        if entry is None or entry[0] != pawn_key:
+            return None
+        return entry[1]
+
+    def store(self, pawn_key, score):
+        """
+        stores the score of a pawn structure
+        :param pawn_key: pawn key of the state
+        :param score: the score for white
+        """
+        self.entries[pawn_key % self.size] = (pawn_key, score)
+
+    def clear(self):
+        """
+        removes all the entries from the table
+        """
+        self.entries = [None] * self.size
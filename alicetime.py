@@ -0,0 +1,174 @@
+"""Implements time management for the Alice Chess Engine search"""
+import time
+
+
+class TimeManager:
+    __doc__ = "Allocates thinking time for every move from the remaining clock time and " \
+              "decides when the search has to stop."
+
+    def __init__(self, remaining_time, increment=0.0, moves_to_go=30, poll_interval=32):
+        """
+        Initializes the clock of this engine
+        :param remaining_time: seconds left on our clock
+        :param increment: seconds added to our clock after every move
+        :param moves_to_go: number of moves the remaining time is spread over
+        :param poll_interval: number of nodes searched between two looks at the clock
+        """
+        self.remaining_time = remaining_time
+        self.increment = increment
+        self.moves_to_go = moves_to_go
+        self.poll_interval = poll_interval
+        self.safety_margin = 0.05
+        self.start_time = time.time()
+        self.soft_limit = 0.0
+        self.hard_limit = 0.0
+        self.stopped = False
+        self.infinite = False
+        self.stop_event = None
+        self.interrupt_event = None
+        self.best_move = None
+        self.stable_iterations = 0
+
+    def update_clock(self, remaining_time, increment=None):
+        """
+        sets the clock to the values given by the caller or the referee
+        :param remaining_time: seconds left on our clock
+        :param increment: seconds added after every move. Unchanged if None
+        """
+        self.remaining_time = remaining_time
+        if increment is not None:
+            self.increment = increment
+
+    def start(self):
+        """
+        starts thinking on a move and calculates the limits for it
+        """
+        self.start_time = time.time()
+        self.stopped = False
+        self.infinite = False
+        self.stop_event = None
+        self.best_move = None
+        self.stable_iterations = 0
+        self.allocate()
+
+    def start_fixed(self, seconds):
+        """
+        starts a search which may take the given time, regardless of our clock
+        :param seconds: seconds the search may take
+        """
+        self.start()
+        self.soft_limit = seconds
+        self.hard_limit = seconds
+
+    def start_infinite(self, stop_event):
+        """
+        starts a search without limits which only ends once the given event is set
+        :param stop_event: multiprocessing.Event set by the process owning the search
+        """
+        self.start()
+        self.infinite = True
+        self.stop_event = stop_event
+
+    def start_pondering(self):
+        """
+        starts thinking on the opponent's time. There are no limits until ponder_hit
+        is called, the search only ends when stop is called.
+        """
+        self.start()
+        self.infinite = True
+
+    def ponder_hit(self):
+        """
+        turns pondering into a normal search once the opponent made the expected move.
+        The limits are calculated afresh and our clock starts running now.
+        """
+        self.start_time = time.time()
+        self.allocate()
+        self.infinite = False
+
+    def allocate(self):
+        """
+        calculates the soft and hard limits for the current move from our clock.
+        The soft limit is the time we would like to spend, the hard limit is never
+        exceeded.
+        """
+        usable_time = max(self.remaining_time - self.safety_margin, 0.0)
+        self.soft_limit = min(usable_time / self.moves_to_go + 0.75 * self.increment,
+                              usable_time)
+        self.hard_limit = min(4 * self.soft_limit, 0.3 * usable_time + self.increment,
+                              usable_time)
+        self.hard_limit = max(self.hard_limit, self.soft_limit)
+
+    def finish(self):
+        """
+        stops thinking on a move and charges the time spent to our clock
+        :return: seconds spent on this move
+        """
+        spent = self.elapsed()
+        self.remaining_time = max(self.remaining_time - spent, 0.0) + self.increment
+        return spent
+
+    def elapsed(self):
+        """
+        gives the time spent on the current move
+        :return: seconds since start was called
+        """
+        return time.time() - self.start_time
+
+    def set_interrupt_event(self, interrupt_event):
+        """
+        sets an event which stops every search once it is set, unlike the stop event it
+        is kept across searches
+        :param interrupt_event: threading.Event set when a message of the referee has
+                                to be handled at once
+        """
+        self.interrupt_event = interrupt_event
+
+    def stop(self):
+        """
+        asks the running search to stop as soon as possible
+        """
+        self.stopped = True
+
+    def should_stop(self, nodes):
+        """
+        checks if the search has to be stopped. The clock is only read every
+        poll_interval nodes as reading it on every node costs search speed.
+        :param nodes: number of nodes searched so far
+        :return: True if the search has to stop else False
+        """
+        if self.stopped or nodes % self.poll_interval:
+            return self.stopped
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.stopped = True
+        elif self.interrupt_event is not None and self.interrupt_event.is_set():
+            self.stopped = True
+        elif not self.infinite and self.elapsed() >= self.hard_limit:
+            self.stopped = True
+        return self.stopped
+
+    def next_iteration(self, best_move, iteration_time):
+        """
+        decides after a completed iteration if another deeper iteration is worth starting.
+        A best move which stays the same over several iterations shrinks the time we
+        would like to spend on this move.
+        :param best_move: the best move found by the completed iteration
+        :param iteration_time: seconds the completed iteration took
+        :return: True if the search should go one ply deeper else False
+        """
+        if best_move is self.best_move:
+            self.stable_iterations += 1
+        else:
+            self.best_move = best_move
+            self.stable_iterations = 0
+        if self.stopped:
+            return False
+        if self.infinite:
+            return True
+        target = self.soft_limit
+        if self.stable_iterations >= 2:
+            target *= 0.5
+        elapsed = self.elapsed()
+        if elapsed + iteration_time > self.hard_limit:
+            return False
+        return elapsed < target
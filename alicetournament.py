@@ -0,0 +1,441 @@
+"""Implements a tournament runner playing Alice Chess Engines against each other"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shlex
+import select
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from aliceengine import *
+from alicebook import OpeningBook, play_moves
+
+ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alice5500.py")
+
+
+class Variant:
+    __doc__ = "An engine taking part in a tournament: a script, its command line options " \
+              "like --search, --depth or --disable-term, and its own time control"
+
+    def __init__(self, name, arguments, engine_path=ENGINE_PATH, clock_time=10.0,
+                 increment=0.1):
+        """
+        Initializer of this class
+        :param name: name of the variant used in the report
+        :param arguments: string of command line options passed to the engine
+        :param engine_path: path of the engine script
+        :param clock_time: seconds on the clock of the variant
+        :param increment: seconds added to the clock of the variant after every move
+        """
+        self.name = name
+        self.arguments = shlex.split(arguments)
+        self.engine_path = engine_path
+        self.clock_time = clock_time
+        self.increment = increment
+
+
+def random_opening(seed, plies):
+    """
+    plays random moves from the standard board
+    :param seed: seed of the random moves, equal seeds give equal openings
+    :param plies: number of moves to play
+    :return: list of keys of the moves played
+    """
+    generator = random.Random(seed)
+    state = Board.create_standard_board()
+    move_keys = []
+    for ply in range(plies):
+        moves = [move for move in state.current_player.legal_moves
+                 if state.current_player.make_move(move).move_status == MoveStatus.DONE]
+        if len(moves) == 0:
+            break
+        move = generator.choice(moves)
+        move_keys.append(move.get_key())
+        state = state.current_player.make_move(move).transition_board
+    return move_keys
+
+
+def book_opening(book, seed, plies):
+    """
+    plays book moves from the standard board, picking them with their weights
+    :param book: an instance of OpeningBook
+    :param seed: seed of the random picks, equal seeds give equal openings
+    :param plies: maximal number of moves to play
+    :return: list of keys of the moves played until the book ran out
+    """
+    generator = random.Random(seed)
+    move_keys = []
+    for ply in range(plies):
+        book_moves = book.probe(play_moves(move_keys).hash_key)
+        if len(book_moves) == 0:
+            break
+        pick = generator.randrange(sum(weight for move_key, weight in book_moves))
+        for move_key, weight in book_moves:
+            if pick < weight:
+                move_keys.append(move_key)
+                break
+            pick -= weight
+    return move_keys
+
+
+def text_to_move(state, message):
+    """
+    reads a move sentence of an engine
+    :param state: instance of Board the move is made in
+    :param message: string with a move sentence
+    :return: an instance of Move doable in the state or None if there is none
+    """
+    words = message.split()
+    if len(words) != 8 or words[0] != state.current_player.get_color() or \
+            words[1] != "moves":
+        return None
+    for move in state.current_player.legal_moves:
+        if str(move.piece).upper() == words[2] and \
+                move.piece.position.board == words[4] and \
+                move.piece.position.index == Position.alg_to_int(words[5]) and \
+                move.destination.index == Position.alg_to_int(words[7]):
+            if state.current_player.make_move(move).move_status == MoveStatus.DONE:
+                return move
+    return None
+
+
+def doable_moves(state):
+    """
+    checks if the player to move has a move
+    :param state: instance of Board representing a state of the game
+    :return: True if a move can be made else False
+    """
+    for move in state.current_player.legal_moves:
+        if state.current_player.make_move(move).move_status == MoveStatus.DONE:
+            return True
+    return False
+
+
+def read_statistics(path):
+    """
+    sums the search statistics written by an engine
+    :param path: path of the JSON lines written with --stats
+    :return: tuple of the nodes, seconds, sum of depths and number of searches
+    """
+    nodes = seconds = depths = searches = 0
+    if os.path.exists(path):
+        for line in open(path):
+            search = json.loads(line)
+            nodes += search["nodes"]
+            seconds += search["seconds"]
+            depths += search["depth"]
+            searches += 1
+        os.remove(path)
+    return nodes, seconds, depths, searches
+
+
+def play_game(task):
+    """
+    referees a game between two engine processes. Runs in the tournament pool.
+    :param task: tuple of the game number, the white and the black Variant, the opening
+                 move keys and the maximal number of plies before the game is drawn.
+                 Every Variant brings its own time control.
+    :return: dictionary with the game number, the score of white, the reason the game
+             ended and the search statistics of both colors
+    """
+    number, white, black, opening, max_plies = task
+    variants = {PlayerColor.White: white, PlayerColor.Black: black}
+    engines = {}
+    stats_paths = {}
+    clocks = {}
+    for color, variant in variants.items():
+        descriptor, stats_paths[color] = tempfile.mkstemp(suffix=".jsonl")
+        os.close(descriptor)
+        command = [sys.executable, variant.engine_path,
+                   "--time", str(variant.clock_time), "--increment", str(variant.increment),
+                   "--stats", stats_paths[color]] + variant.arguments
+        if len(opening) > 0:
+            command += ["--opening", ",".join(str(move_key) for move_key in opening)]
+        engines[color] = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          cwd=tempfile.gettempdir())
+        clocks[color] = variant.clock_time
+    state = play_moves(opening)
+    for color in variants:
+        engines[color].stdin.write("you are " + color + "\n")
+        engines[color].stdin.flush()
+    plies = len(opening)
+    while True:
+        color = state.current_player.get_color()
+        opponent = state.current_player.get_opponent().get_color()
+        if not doable_moves(state):
+            if state.current_player.is_in_check():
+                white_score, reason = (0.0 if color == PlayerColor.White else 1.0), "mate"
+            else:
+                white_score, reason = 0.5, "stalemate"
+            break
+        if plies >= max_plies:
+            white_score, reason = 0.5, "move limit"
+            break
+        start_time = time.time()
+        message = ""
+        if select.select([engines[color].stdout], [], [], max(clocks[color], 0) + 1.0)[0]:
+            message = engines[color].stdout.readline().strip()
+        clocks[color] -= time.time() - start_time
+        move = text_to_move(state, message)
+        if clocks[color] < 0:
+            white_score, reason = (0.0 if color == PlayerColor.White else 1.0), "time"
+            break
+        if move is None:
+            reason = "surrender" if "surrenders" in message else "illegal move"
+            white_score = 0.0 if color == PlayerColor.White else 1.0
+            break
+        clocks[color] += variants[color].increment
+        state = state.current_player.make_move(move).transition_board
+        plies += 1
+        engines[opponent].stdin.write("time " + str(clocks[opponent]) + " " +
+                                      str(variants[opponent].increment) + "\n" +
+                                      message + "\n")
+        engines[opponent].stdin.flush()
+    if white_score == 0.5:
+        result = "drawn"
+    else:
+        result = (PlayerColor.White if white_score == 1.0 else PlayerColor.Black) + " wins"
+    statistics = {}
+    for color in variants:
+        try:
+            engines[color].stdin.write(result + "\n")
+            engines[color].stdin.flush()
+        except IOError:
+            pass
+        if engines[color].poll() is None:
+            time.sleep(0.5)
+        if engines[color].poll() is None:
+            engines[color].kill()
+        engines[color].wait()
+        statistics[color] = read_statistics(stats_paths[color])
+    return {"game": number, "white": white.name, "black": black.name,
+            "white_score": white_score, "reason": reason, "plies": plies,
+            "statistics": statistics}
+
+
+class Tournament:
+    __doc__ = "Plays a match between two variants on a process pool and keeps the " \
+              "score, the Elo difference and the sequential probability ratio test of " \
+              "the first variant against the second."
+
+    def __init__(self, first, second, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05):
+        """
+        Initializer of this class
+        :param first: the Variant being tested
+        :param second: the Variant it is tested against
+        :param elo0: Elo difference of the null hypothesis of the test
+        :param elo1: Elo difference of the alternative hypothesis of the test
+        :param alpha: probability of accepting elo1 when elo0 is true
+        :param beta: probability of accepting elo0 when elo1 is true
+        """
+        self.first = first
+        self.second = second
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+        self.wins = self.draws = self.losses = 0
+        self.statistics = {first.name: [0, 0.0, 0, 0], second.name: [0, 0.0, 0, 0]}
+
+    def add(self, game):
+        """
+        counts a finished game
+        :param game: dictionary returned by play_game
+        """
+        first_score = game["white_score"]
+        if game["black"] == self.first.name:
+            first_score = 1.0 - first_score
+        if first_score == 1.0:
+            self.wins += 1
+        elif first_score == 0.5:
+            self.draws += 1
+        else:
+            self.losses += 1
+        for color, name in [(PlayerColor.White, game["white"]),
+                            (PlayerColor.Black, game["black"])]:
+            totals = self.statistics[name]
+            for index, value in enumerate(game["statistics"][color]):
+                totals[index] += value
+
+    def games(self):
+        """
+        :return: number of games counted
+        """
+        return self.wins + self.draws + self.losses
+
+    def score(self):
+        """
+        :return: tuple of the average score of the first variant and its variance per game
+        """
+        games = self.games()
+        score = (self.wins + 0.5 * self.draws) / games
+        variance = (self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2 +
+                    self.losses * score ** 2) / games
+        return score, variance
+
+    @staticmethod
+    def elo(score):
+        """
+        converts an average score into an Elo difference
+        :param score: average score between 0 and 1
+        :return: Elo difference
+        """
+        score = min(max(score, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / score - 1)
+
+    def elo_interval(self):
+        """
+        :return: tuple of the Elo difference of the first variant and the margin of its
+                 95 percent confidence interval
+        """
+        score, variance = self.score()
+        margin = 1.96 * math.sqrt(variance / self.games())
+        lower = Tournament.elo(score - margin)
+        upper = Tournament.elo(score + margin)
+        return Tournament.elo(score), (upper - lower) / 2
+
+    def log_likelihood_ratio(self):
+        """
+        calculates the log likelihood ratio of elo1 against elo0 with the normal
+        approximation of the game results
+        :return: the log likelihood ratio
+        """
+        score, variance = self.score()
+        if variance == 0:
+            return 0.0
+        score0 = 1 / (1 + 10 ** (-self.elo0 / 400))
+        score1 = 1 / (1 + 10 ** (-self.elo1 / 400))
+        return self.games() * (score1 - score0) * (2 * score - score0 - score1) / \
+            (2 * variance)
+
+    def decision(self):
+        """
+        checks if the sequential probability ratio test is finished
+        :return: "H1" if elo1 is accepted, "H0" if elo0 is accepted else None
+        """
+        if self.games() == 0:
+            return None
+        ratio = self.log_likelihood_ratio()
+        if ratio >= self.upper_bound:
+            return "H1"
+        if ratio <= self.lower_bound:
+            return "H0"
+        return None
+
+    def report(self):
+        """
+        :return: dictionary with the score, Elo and speed of the match so far
+        """
+        elo, margin = self.elo_interval()
+        report = {"games": self.games(), "wins": self.wins, "draws": self.draws,
+                  "losses": self.losses, "elo": round(elo, 1), "elo_margin": round(margin, 1),
+                  "llr": round(self.log_likelihood_ratio(), 3),
+                  "llr_bounds": [round(self.lower_bound, 3), round(self.upper_bound, 3)],
+                  "sprt": self.decision()}
+        for name, (nodes, seconds, depths, searches) in self.statistics.items():
+            report[name] = {"nps": int(nodes / seconds) if seconds > 0 else 0,
+                            "depth": round(float(depths) / searches, 2) if searches else 0}
+        return report
+
+
+def run_tournament(tournament, games, pool, opening_plies=4, book=None, max_plies=200,
+                   seed=0):
+    """
+    plays games on a pool until their number is reached or the test is finished. Games
+    come in pairs playing the same opening with the colors swapped.
+    :param tournament: an instance of Tournament
+    :param games: maximal number of games to play
+    :param pool: multiprocessing.Pool the games run on
+    :param opening_plies: number of opening moves played before the engines take over
+    :param book: an instance of OpeningBook the openings are taken from, None for random
+                 openings
+    :param max_plies: number of plies after which a game is drawn
+    :param seed: seed of the openings
+    :return: the final report of the tournament
+    """
+    tasks = []
+    for number in range(games):
+        pair_seed = seed * 1000003 + number // 2
+        if book is not None:
+            opening = book_opening(book, pair_seed, opening_plies)
+        else:
+            opening = random_opening(pair_seed, opening_plies)
+        if number % 2 == 0:
+            white, black = tournament.first, tournament.second
+        else:
+            white, black = tournament.second, tournament.first
+        tasks.append((number, white, black, opening, max_plies))
+    for game in pool.imap_unordered(play_game, tasks):
+        tournament.add(game)
+        sys.stderr.write(json.dumps(game, sort_keys=True) + "\n")
+        if tournament.decision() is not None:
+            pool.terminate()
+            break
+    return tournament.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alice Chess engine tournament runner")
+    parser.add_argument("--first", default="", metavar="ARGS",
+                        help="command line options of the variant being tested")
+    parser.add_argument("--second", default="", metavar="ARGS",
+                        help="command line options of the variant it is tested against")
+    parser.add_argument("--first-engine", default=ENGINE_PATH, metavar="PATH",
+                        help="engine script of the variant being tested")
+    parser.add_argument("--second-engine", default=ENGINE_PATH, metavar="PATH",
+                        help="engine script of the variant it is tested against")
+    parser.add_argument("--games", type=int, default=1000,
+                        help="maximal number of games")
+    parser.add_argument("--concurrency", type=int, default=multiprocessing.cpu_count(),
+                        help="number of games played at the same time")
+    parser.add_argument("--time", type=float, default=10.0,
+                        help="seconds on the clock of a variant without its own time")
+    parser.add_argument("--increment", type=float, default=0.1,
+                        help="seconds added to a clock after every move for a variant "
+                             "without its own increment")
+    parser.add_argument("--first-time", type=float, metavar="SECONDS",
+                        help="seconds on the clock of the variant being tested")
+    parser.add_argument("--first-increment", type=float, metavar="SECONDS",
+                        help="increment of the variant being tested")
+    parser.add_argument("--second-time", type=float, metavar="SECONDS",
+                        help="seconds on the clock of the variant it is tested against")
+    parser.add_argument("--second-increment", type=float, metavar="SECONDS",
+                        help="increment of the variant it is tested against")
+    parser.add_argument("--opening-plies", type=int, default=4,
+                        help="number of opening moves played before the engines take over")
+    parser.add_argument("--book", metavar="PATH",
+                        help="opening book the openings are taken from instead of random "
+                             "moves")
+    parser.add_argument("--max-plies", type=int, default=200,
+                        help="number of plies after which a game is drawn")
+    parser.add_argument("--elo0", type=float, default=0.0,
+                        help="Elo difference of the null hypothesis")
+    parser.add_argument("--elo1", type=float, default=5.0,
+                        help="Elo difference of the alternative hypothesis")
+    parser.add_argument("--alpha", type=float, default=0.05, help="false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="false negative rate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the openings")
+    options = parser.parse_args()
+    first_variant = Variant("first", options.first, options.first_engine,
+                            options.time if options.first_time is None
+                            else options.first_time,
+                            options.increment if options.first_increment is None
+                            else options.first_increment)
+    second_variant = Variant("second", options.second, options.second_engine,
+                             options.time if options.second_time is None
+                             else options.second_time,
+                             options.increment if options.second_increment is None
+                             else options.second_increment)
+    tournament = Tournament(first_variant, second_variant,
+                            options.elo0, options.elo1, options.alpha, options.beta)
+    opening_book = OpeningBook(options.book) if options.book is not None else None
+    final_report = run_tournament(tournament, options.games,
+                                  multiprocessing.Pool(options.concurrency),
+                                  options.opening_plies,
+                                  opening_book, options.max_plies, options.seed)
+    sys.stdout.write(json.dumps(final_report, sort_keys=True) + "\n")